@@ -1 +1 @@
-from .client import RequestContext
+from .client import RequestContext, AsyncRequestContext
@@ -0,0 +1,126 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+
+"""
+Stores for the checkpoints written by :py:func:`canvas_sdk.utils.get_all_list_data_resumable`.  A
+checkpoint records, under a key chosen by the caller, the items of every page retrieved so far and
+the url of the next page, so that a paginated export that fails part way can be resumed by a later
+run instead of starting over from the first page.  Stores implement load, append and delete.
+"""
+
+
+class FileCheckpointStore(object):
+
+    """
+    Keeps each checkpoint in a file of its own in directory, with one line of json per page appended as the page
+    is retrieved, so that saving a checkpoint never rewrites the pages before it.
+
+    :param str directory: Directory the checkpoint files are written to, which is created if it does not exist
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Keys may contain characters that are not allowed in file names
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.jsonl')
+
+    def load(self, key):
+        """
+        Return the (next_url, items) checkpointed under key, or None if there is no checkpoint.  A page left half
+        written by a process that died is cut from the file, so that the pages appended after it can be read.
+        """
+        try:
+            with open(self._path(key), 'r+b') as checkpoint:
+                next_url, items, end = None, [], 0
+                for line in checkpoint:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('Page written without its newline')
+                        page = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        # A page that was being written when the process died
+                        checkpoint.truncate(end)
+                        break
+                    next_url = page['next_url']
+                    items.extend(page['items'])
+                    end += len(line)
+        except FileNotFoundError:
+            return None
+        return (next_url, items) if next_url else None
+
+    def append(self, key, next_url, items):
+        """
+        Add the items of a page to the checkpoint under key, and record next_url as the page to resume from.
+        """
+        with open(self._path(key), 'a', encoding='utf-8') as checkpoint:
+            checkpoint.write(json.dumps({'next_url': next_url, 'items': items}) + '\n')
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+    def delete(self, key):
+        """
+        Remove the checkpoint under key, if any.
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(key))
+
+
+class SQLiteCheckpointStore(object):
+
+    """
+    Keeps checkpoints in an SQLite database file, one row per page, which may be shared by several processes.
+
+    :param str filename: Path of the database file, which is created if it does not exist
+    :param float timeout: (optional) Seconds to wait for another process to release a lock on the database
+    """
+
+    def __init__(self, filename, timeout=30.0):
+        self.filename = filename
+        self.timeout = timeout
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoint_pages ('
+                'key TEXT NOT NULL, page INTEGER NOT NULL, next_url TEXT NOT NULL, items TEXT NOT NULL, '
+                'PRIMARY KEY (key, page))')
+
+    @contextlib.contextmanager
+    def _connection(self):
+        # A connection per operation, so the store can be used from any thread or process
+        with contextlib.closing(sqlite3.connect(self.filename, timeout=self.timeout)) as connection:
+            with connection:
+                yield connection
+
+    def load(self, key):
+        """
+        Return the (next_url, items) checkpointed under key, or None if there is no checkpoint.
+        """
+        with self._connection() as connection:
+            rows = connection.execute(
+                'SELECT next_url, items FROM checkpoint_pages WHERE key = ? ORDER BY page', (key,)).fetchall()
+        if not rows:
+            return None
+        items = []
+        for _, page_items in rows:
+            items.extend(json.loads(page_items))
+        return rows[-1][0], items
+
+    def append(self, key, next_url, items):
+        """
+        Add the items of a page to the checkpoint under key, and record next_url as the page to resume from.
+        """
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT INTO checkpoint_pages SELECT ?, COALESCE(MAX(page), 0) + 1, ?, ? FROM checkpoint_pages '
+                'WHERE key = ?', (key, next_url, json.dumps(items), key))
+
+    def delete(self, key):
+        """
+        Remove the checkpoint under key, if any.
+        """
+        with self._connection() as connection:
+            connection.execute('DELETE FROM checkpoint_pages WHERE key = ?', (key,))
@@ -1,3 +1,8 @@
 from .request_context import RequestContext
+from .async_request_context import AsyncRequestContext
 from .auth import OAuth2Bearer
+from .throttle import RateLimitThrottle
+from .retry import ExponentialBackoff, DecorrelatedJitterBackoff
+from .cache import MemoryCache, SQLiteCache
+from .json_decoders import fast_json_decoder
 from .base import get, put, post, delete
@@ -0,0 +1,231 @@
+import asyncio
+import datetime
+import logging
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import base
+from .auth import OAuth2Bearer
+from .async_request_context import build_ssl_context
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:  # aiohttp is an optional dependency (pip install canvas_python_sdk[async])
+    aiohttp = None
+    TRANSIENT_NETWORK_ERRORS = ()
+else:
+    # aiohttp equivalents of client.base.TRANSIENT_NETWORK_ERRORS
+    TRANSIENT_NETWORK_ERRORS = (
+        aiohttp.ClientConnectionError,  # refused, reset or dropped connections
+        aiohttp.ClientPayloadError,  # connection dropped while reading the body
+        asyncio.TimeoutError,
+    )
+    # Failures to connect, which never reached Canvas (see client.base.is_connect_error): refused
+    # connections, failed name lookups and connect timeouts, but not failed TLS handshakes
+    CONNECT_ERRORS = (aiohttp.ClientConnectorError, getattr(aiohttp, 'ConnectionTimeoutError', ()))
+    TLS_ERRORS = (aiohttp.ClientSSLError, aiohttp.ClientConnectorCertificateError)
+
+log = logging.getLogger(__name__)
+
+"""
+Awaitable twins of the functions in :py:mod:`client.base`.  They are used automatically when an
+:class:`AsyncRequestContext` is passed to :py:mod:`client.base` (and therefore to any generated
+function in :py:mod:`canvas_sdk.methods`), but may also be awaited directly.
+"""
+
+
+async def get(request_context, url, payload=None, **optional_request_params):
+    """
+    Shortcut for making a GET call to the API.  Data is passed as url params.
+    """
+    base.merge_or_create_key_value_for_dictionary(optional_request_params, 'params', payload)
+    return await call("GET", url, request_context, **optional_request_params)
+
+
+async def put(request_context, url, payload=None, **optional_request_params):
+    """
+    Shortcut for making a PUT call to the API
+    """
+    base.merge_or_create_key_value_for_dictionary(optional_request_params, 'data', payload)
+    return await call("PUT", url, request_context, **optional_request_params)
+
+
+async def post(request_context, url, payload=None, **optional_request_params):
+    """
+    Shortcut for making a POST call to the API
+    """
+    base.merge_or_create_key_value_for_dictionary(optional_request_params, 'data', payload)
+    return await call("POST", url, request_context, **optional_request_params)
+
+
+async def delete(request_context, url, payload=None, **optional_request_params):
+    """
+    Shortcut for making a DELETE call to the API
+    """
+    base.merge_or_create_key_value_for_dictionary(optional_request_params, 'data', payload)
+    return await call("DELETE", url, request_context, **optional_request_params)
+
+
+def is_connect_error(network_error):
+    """
+    Awaitable transport's equivalent of :py:func:`client.base.is_connect_error`: whether a network
+    error means that no connection could be made to Canvas, so that the request is safe to retry
+    whether or not it is idempotent.
+
+    :param network_error: One of TRANSIENT_NETWORK_ERRORS
+    """
+    return isinstance(network_error, CONNECT_ERRORS) and not isinstance(network_error, TLS_ERRORS)
+
+
+def build_response(aiohttp_response, content, prepared_request, elapsed):
+    """
+    Copy a fully read aiohttp response into a :class:`requests.Response` so that callers (and
+    helpers such as :py:func:`canvas_sdk.utils.get_all_list_data`) see the same interface
+    regardless of the transport that was used.
+
+    :param aiohttp_response: The aiohttp.ClientResponse that was received
+    :param bytes content: The body of the response
+    :param prepared_request: The :class:`requests.PreparedRequest` that was sent
+    :param elapsed: The time spent waiting on the response
+    :type elapsed: datetime.timedelta
+    :rtype: :class:`requests.Response`
+    """
+    response = requests.Response()
+    response.status_code = aiohttp_response.status
+    response.reason = aiohttp_response.reason
+    # Repeated headers are folded into a single comma separated value, as requests does
+    response.headers = CaseInsensitiveDict(
+        (key, ', '.join(aiohttp_response.headers.getall(key))) for key in aiohttp_response.headers.keys())
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = str(aiohttp_response.url)
+    response._content = content
+    response.request = prepared_request
+    response.elapsed = elapsed
+    return response
+
+
+def build_client_timeout(timeout):
+    """
+    Translate a requests-style timeout (a single value or a (connect, read) tuple)
+    into an aiohttp.ClientTimeout.  As with requests, None means wait forever.
+    """
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+async def call(action, url, request_context, params=None, data=None, max_retries=None,
+               auth_token=None, files=None, headers=None, cookies=None, timeout=None,
+               proxies=None, verify=None, cert=None, allow_redirects=True,
+               idempotent=None, stream=False):
+    """
+    Awaitable equivalent of :py:func:`client.base.call` that sends the request over the
+    aiohttp session of an :class:`AsyncRequestContext`.  Requests are prepared with the
+    requests library, so query strings, bodies and headers are encoded identically, and the
+    result is returned as a :class:`requests.Response <Response>` object.  See
+    :py:func:`client.base.call` for a description of the parameters; stream is
+    accepted for compatibility, but the body is always read before returning.
+    """
+    # This will be an aiohttp.ClientSession owning the context's connection pool
+    aiohttp_session = request_context.session
+    throttle = request_context.throttle
+    # Default back to value in request_context
+    retries = max_retries or request_context.max_retries
+    if retries is None:
+        retries = 0  # Fall back if max_retries in context is explicitly None
+    # Set up an authentication callable using OAuth2Bearer if we have a token
+    auth = None
+    if auth_token:
+        auth = OAuth2Bearer(auth_token)
+    if idempotent is None:
+        idempotent = action.upper() in base.IDEMPOTENT_ACTIONS
+    if timeout is None:
+        timeout = request_context.get_timeout(action, url)
+    per_page = base.choose_per_page(request_context, action, url, params)
+    if per_page is not None:
+        params = dict(params, per_page=per_page)
+    cache_key = base.get_cache_key(request_context, action, url, params, auth_token)
+    cached = base.get_cached_entry(request_context, cache_key)
+    if cached is not None:
+        if cached.is_fresh:
+            return cached.response
+        # Revalidate the stale entry with a conditional request
+        headers = dict(headers or {}, **cached.conditional_headers)
+    prepared_request = request_context.preparer.prepare_request(requests.Request(
+        action, url, params=params, data=data, headers=headers, cookies=cookies,
+        files=files, auth=auth))
+    proxy = (proxies or request_context.proxies or {}).get(urlparse(url).scheme)
+    ssl = True  # Use the connector's ssl settings unless overridden for this call
+    if verify is not None or cert is not None:
+        ssl = build_ssl_context(
+            request_context.verify if verify is None else verify, cert or request_context.cert)
+    client_timeout = build_client_timeout(timeout)
+
+    async def send():
+        delay = 0
+        # try the request until max_retries is reached.  we need to account for the
+        # fact that the first iteration through isn't a retry, so add 1 to max_retries
+        for retry in range(retries + 1):
+            if throttle:
+                await throttle.async_acquire()
+            st = time.time()
+            try:
+                # send the prepared request; the url is already encoded
+                try:
+                    async with aiohttp_session.request(
+                            prepared_request.method, URL(prepared_request.url, encoded=True),
+                            data=prepared_request.body, headers=prepared_request.headers,
+                            proxy=proxy, ssl=ssl, timeout=client_timeout,
+                            allow_redirects=allow_redirects) as aiohttp_response:
+                        content = await aiohttp_response.read()
+                finally:
+                    if throttle:
+                        throttle.release()
+                response = build_response(
+                    aiohttp_response, content, prepared_request,
+                    datetime.timedelta(seconds=time.time() - st))
+                if throttle:
+                    throttle.update(response)
+
+                # raise an http exception if one occured
+                response.raise_for_status()
+
+            except HTTPError as http_error:
+                log.info("Caught an API Error returned by Canvas: %s", str(http_error))
+                # If we can't retry the request, raise a CanvasAPIError (or an
+                # InvalidOAuthTokenError if the token was rejected)
+                if not base.is_retriable_error(response) or retry >= retries:
+                    base.raise_canvas_api_error(response, request_context)
+                delay = base.get_retry_delay(request_context, action, url, retry + 1, delay,
+                                             response=response, error=http_error)
+                if delay:
+                    await asyncio.sleep(delay)
+            except TRANSIENT_NETWORK_ERRORS as network_error:
+                log.info("Caught a network error calling Canvas: %s", str(network_error))
+                # A failure to connect means the request never reached Canvas, so it
+                # is safe to retry whether or not it is idempotent
+                if not (idempotent or is_connect_error(network_error)) or retry >= retries:
+                    raise
+                delay = base.get_retry_delay(request_context, action, url, retry + 1, delay,
+                                             error=network_error)
+                if delay:
+                    await asyncio.sleep(delay)
+            else:
+                log.debug('API_CALL_DURATION {} {}'.format(url, time.time()-st))
+                if per_page is not None:
+                    request_context.update_per_page(url, response)
+                return base.update_cache(request_context, action, url, cache_key, response, cached)
+
+    # Join an identical GET that is already in flight instead of sending another
+    flight_key = base.get_coalescing_key(request_context, action, url, params, auth_token)
+    if flight_key is not None:
+        return await request_context.single_flight.async_do(flight_key, send)
+    return await send()
@@ -0,0 +1,160 @@
+# async_request_context.py
+import os
+import ssl
+
+from .request_context import RequestContext
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is an optional dependency (pip install canvas_python_sdk[async])
+    aiohttp = None
+
+
+def build_ssl_context(verify, cert):
+    """
+    Translate requests-style verify and cert values into the ``ssl`` argument accepted by aiohttp.  Returns True
+    when aiohttp's default certificate verification should be used.
+
+    :param verify: if ``True``, the SSL cert will be verified.  A CA_BUNDLE path can also be provided.
+    :type verify: boolean or str
+    :param cert: if String, path to ssl client cert file (.pem).  If Tuple, ('cert', 'key') pair.
+    :type cert: str or Tuple
+    """
+    if verify is False:
+        return False
+    if isinstance(verify, str):
+        ssl_context = ssl.create_default_context(cafile=verify)
+    elif cert:
+        ssl_context = ssl.create_default_context()
+    else:
+        return True
+    if cert:
+        if isinstance(cert, str):
+            ssl_context.load_cert_chain(cert)
+        else:
+            ssl_context.load_cert_chain(*cert)
+    return ssl_context
+
+
+class AsyncRequestContext(RequestContext):
+
+    """
+    A :class:`RequestContext <RequestContext>` whose requests are sent over an asyncio transport (aiohttp) instead
+    of a blocking requests.Session.  It accepts the same parameters as :class:`RequestContext <RequestContext>`.
+    When an instance of this class is passed to :py:mod:`client.base` (and therefore to any generated function in
+    :py:mod:`canvas_sdk.methods`), the call returns an awaitable that resolves to a :class:`requests.Response`:
+
+        async with AsyncRequestContext(token, 'https://canvas.example.edu/api') as ctx:
+            responses = await asyncio.gather(*[get_single_course_courses(ctx, i) for i in course_ids])
+
+    The underlying aiohttp.ClientSession is bound to the event loop it was created on, so a context should only be
+    used from a single event loop.  Call :meth:`close` (or use the context as an async context manager) when done,
+    and await :meth:`expire_session`, which closes the current session too, to start over with a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncRequestContext requires the aiohttp library; install it with "
+                "'pip install canvas_python_sdk[async]'.")
+        super(AsyncRequestContext, self).__init__(*args, **kwargs)
+
+    _connection_state_attributes = RequestContext._connection_state_attributes + ('_preparer', '_pool_counts')
+
+    def _reset_connection_state(self):
+        super(AsyncRequestContext, self)._reset_connection_state()
+        self._preparer = None
+        self._pool_counts = {'requests': 0, 'new_connections': 0}
+
+    @property
+    def ssl(self):
+        """
+        The value passed as the ``ssl`` argument of aiohttp requests, built from the verify and cert attributes
+        """
+        return build_ssl_context(self.verify, self.cert)
+
+    @property
+    def preparer(self):
+        """
+        A requests.Session that is never used to send anything.  It prepares each request so that headers, auth,
+        cookies, query strings and bodies are merged and encoded exactly as they would be by :class:`RequestContext`.
+        """
+        if self._preparer is None:
+            self._preparer = self._build_session()
+        return self._preparer
+
+    @property
+    def session(self):
+        """
+        Get or set an aiohttp.ClientSession.  Headers, authentication and cookies are applied to each request by
+        :py:mod:`client.async_base` (mirroring a requests.Session), so the session only owns the connection pool.
+        """
+        if self._pid != os.getpid():
+            self._reset_connection_state()
+        if not self._session or self._session.closed:
+            # aiohttp always waits for a free connection once its limits are reached (as requests
+            # does with pool_block), so gathering many calls never opens more than pool_maxsize
+            # connections to a host
+            self._pool_counts = {'requests': 0, 'new_connections': 0}
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=self.ssl, limit=self.pool_connections * self.pool_maxsize,
+                    limit_per_host=self.pool_maxsize),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[self._build_trace_config(self._pool_counts)],
+            )
+        return self._session
+
+    @session.setter
+    def session(self, sess):
+        self._session = sess
+
+    @staticmethod
+    def _build_trace_config(counts):
+        """
+        Build an aiohttp.TraceConfig that counts the requests sent by a session, and the connections opened for them,
+        in counts.
+        """
+        async def on_request_start(session, trace_context, params):
+            counts['requests'] += 1
+
+        async def on_connection_create_end(session, trace_context, params):
+            counts['new_connections'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    def pool_stats(self):
+        """
+        Report how well the connection pool of the session is being reused, as for a :class:`RequestContext`.  Counts
+        are kept since the aiohttp session was created, so they reset when it is closed.
+
+        :rtype: dictionary
+        """
+        stats = dict(self._pool_counts)
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        return stats
+
+    async def expire_session(self):
+        """
+        Close the aiohttp.ClientSession (and its connection pool), so that the next request creates a new one.  Unlike
+        :meth:`RequestContext.expire_session`, this is a coroutine and must be awaited, since the connections of the
+        session can only be closed from the event loop.
+        """
+        await self.close()
+
+    async def close(self):
+        """
+        Close the underlying aiohttp.ClientSession (and its connection pool), if one was created.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -1,10 +1,18 @@
 import logging
 
 import requests
-from requests.exceptions import HTTPError
+from requests.exceptions import ConnectTimeout, HTTPError
 import time
+from urllib.parse import urlparse
+from urllib3.exceptions import NewConnectionError, ProxyError
 
 from .auth import OAuth2Bearer
+from .cache import CacheEntry, build_cache_key
+from .json_decoders import decode_json
+from . import async_base
+from .async_request_context import AsyncRequestContext
+from .retry import RetryAttempt
+from .throttle import is_rate_limit_error
 from canvas_sdk.exceptions import (CanvasAPIError, InvalidOAuthTokenError)
 
 log = logging.getLogger(__name__)
@@ -17,6 +25,196 @@ RETRY_ERROR_CODES = (
     requests.codes['gateway_timeout']  # 504
 )
 
+# Failures that happen before a complete response is received.  They are
+# retried like RETRY_ERROR_CODES, but only for idempotent requests (see
+# IDEMPOTENT_ACTIONS) since Canvas may already have acted on the request.
+TRANSIENT_NETWORK_ERRORS = (
+    requests.exceptions.ConnectionError,  # refused or reset connections, including ConnectTimeout
+    requests.exceptions.Timeout,  # ReadTimeout
+    requests.exceptions.ChunkedEncodingError,  # connection dropped while reading the body
+)
+
+IDEMPOTENT_ACTIONS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+def is_connect_error(network_error):
+    """
+    Whether a network error means that no connection could be made to Canvas (or the proxy in front of it): the
+    connection was refused, the host name could not be resolved or connecting timed out.  Such a request never
+    reached Canvas, so it is safe to retry whether or not it is idempotent.
+
+    :param network_error: One of TRANSIENT_NETWORK_ERRORS
+    """
+    if isinstance(network_error, ConnectTimeout):
+        return True
+    if not isinstance(network_error, requests.exceptions.ConnectionError) or not network_error.args:
+        return False
+    # requests wraps the urllib3 error that caused the failure
+    reason = getattr(network_error.args[0], 'reason', None)
+    if isinstance(reason, ProxyError):
+        reason = reason.original_error
+    return isinstance(reason, NewConnectionError)
+
+
+def is_retriable_error(response):
+    """
+    Whether an error response may succeed if the request is sent again: either its status code
+    is one of RETRY_ERROR_CODES or it is a 403 "Rate Limit Exceeded" response.
+
+    :param response: The error response returned by Canvas
+    :type response: :class:`requests.Response`
+    :rtype: bool
+    """
+    return response.status_code in RETRY_ERROR_CODES or is_rate_limit_error(response)
+
+
+def get_cache_key(request_context, action, url, params=None, auth_token=None):
+    """
+    Return the key the response to a request should be cached under, or None if
+    the request context has no cache or the request must not be cached (it is
+    not a GET, or no cache ttl is configured for the endpoint and responses are
+    not revalidated).
+
+    :param RequestContext request_context: The context the request is made with
+    :param str action: The http method of the request
+    :param str url: The url of the request
+    :param params: (optional) Query parameters of the request
+    :param str auth_token: (optional) OAuth2 token overriding the context token
+    :rtype: str or None
+    """
+    if request_context.cache is None or action.upper() != 'GET':
+        return None
+    if not (request_context.get_cache_ttl(url) or request_context.cache_revalidate):
+        return None
+    return build_cache_key(url, params, auth_token or request_context.auth_token)
+
+
+def get_coalescing_key(request_context, action, url, params=None, auth_token=None):
+    """
+    Return the key identical requests in flight at the same time are coalesced
+    under, or None if the request context does not coalesce requests or the
+    request is not a GET.  Requests for the same url and params (including a
+    masquerading as_user_id) made with the same token share a key.
+
+    :param RequestContext request_context: The context the request is made with
+    :param str action: The http method of the request
+    :param str url: The url of the request
+    :param params: (optional) Query parameters of the request
+    :param str auth_token: (optional) OAuth2 token overriding the context token
+    :rtype: str or None
+    """
+    if request_context.single_flight is None or action.upper() != 'GET':
+        return None
+    return build_cache_key(url, params, auth_token or request_context.auth_token)
+
+
+def choose_per_page(request_context, action, url, params):
+    """
+    Return the page size the request context chooses for a list request (a GET
+    whose params have a per_page of None, as sent by the generated list methods
+    when neither the caller nor the context set one), or None if the request
+    should be sent as is.  See :meth:`RequestContext.get_per_page`.
+
+    :param RequestContext request_context: The context the request is made with
+    :param str action: The http method of the request
+    :param str url: The url of the request
+    :param params: Query parameters of the request
+    :rtype: int or None
+    """
+    if action.upper() != 'GET' or not isinstance(params, dict):
+        return None
+    if 'per_page' not in params or params['per_page'] is not None:
+        return None
+    return request_context.get_per_page(url)
+
+
+def get_cached_entry(request_context, cache_key):
+    """
+    Look up the cache entry for a request.  Returns a fresh entry, a stale entry
+    that should be revalidated (when the context has cache_revalidate set), or
+    None if the request has no cache key or nothing usable is cached.
+
+    :param RequestContext request_context: The context the request is made with
+    :param cache_key: The key returned by :py:func:`get_cache_key`
+    :type cache_key: str or None
+    :rtype: :class:`CacheEntry` or None
+    """
+    if cache_key is None:
+        return None
+    return request_context.cache.get(
+        cache_key, allow_stale=request_context.cache_revalidate)
+
+
+def update_cache(request_context, action, url, cache_key, response, cached=None):
+    """
+    Store the 2xx response to a cacheable request in the request context's
+    cache, or invalidate the cached responses a successful PUT, POST or DELETE
+    may have made stale.  If the response is a 304 Not Modified answer to the
+    revalidation of a cached entry, the entry is refreshed and its response
+    returned instead; other responses are never cached.
+
+    :param RequestContext request_context: The context the request was made with
+    :param str action: The http method of the request
+    :param str url: The url of the request
+    :param cache_key: The key returned by :py:func:`get_cache_key`
+    :type cache_key: str or None
+    :param response: The successful response
+    :type response: :class:`requests.Response`
+    :param cached: (optional) The stale entry that was being revalidated
+    :type cached: :class:`CacheEntry` or None
+    :return: The response to hand back to the caller
+    :rtype: :class:`requests.Response`
+    """
+    cache = request_context.cache
+    if cache is None:
+        return response
+    if cache_key is not None:
+        if cached is not None and response.status_code == requests.codes['not_modified']:
+            response = cached.response
+        elif not 200 <= response.status_code < 300:
+            # e.g. a 304 to the caller's own conditional request, which has no body to serve
+            return response
+        expires = time.time() + (request_context.get_cache_ttl(url) or 0)
+        cache.set(cache_key, CacheEntry(
+            response, expires, urlparse(url).path,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')))
+    elif action.upper() not in ('GET', 'HEAD', 'OPTIONS'):
+        cache.invalidate(url)
+    return response
+
+
+def get_retry_delay(request_context, action, url, attempt, previous_delay,
+                    response=None, error=None):
+    """
+    Work out how long to wait before retrying a failed request, using the backoff
+    policy of the request context (no wait if it has none), and record the attempt
+    by logging it and passing a :class:`RetryAttempt` to the context's on_retry
+    callback.
+
+    :param RequestContext request_context: The context the request was made with
+    :param str action: The http method of the request
+    :param str url: The url of the request
+    :param int attempt: Number of the retry about to be made, starting at 1
+    :param float previous_delay: The delay used before the previous retry
+    :param response: (optional) The failed response, if one was received
+    :type response: :class:`requests.Response` or None
+    :param error: (optional) The exception raised for the failed request
+    :return: Number of seconds to wait before retrying
+    :rtype: float
+    """
+    backoff = request_context.backoff
+    delay = 0
+    if backoff:
+        delay = backoff.get_delay(attempt, previous_delay, response)
+    status_code = response.status_code if response is not None else None
+    log.info("Retrying %s %s (retry %s, status %s) in %.2f seconds",
+             action, url, attempt, status_code, delay)
+    if request_context.on_retry:
+        request_context.on_retry(RetryAttempt(
+            action, url, attempt, status_code, error, delay))
+    return delay
+
 
 def merge_or_create_key_value_for_dictionary(target, key, value=None):
     """
@@ -38,6 +236,39 @@ def merge_or_create_key_value_for_dictionary(target, key, value=None):
             target.update({key: value})
 
 
+def raise_canvas_api_error(response, request_context=None):
+    """
+    Raise the exception for an error response that can't (or can no longer) be retried.  An
+    :class:`InvalidOAuthTokenError` is raised for 401 responses that carry a WWW-Authenticate
+    header; any other response results in a :class:`CanvasAPIError`.
+
+    :param response: The error response returned by Canvas
+    :type response: :class:`requests.Response`
+    :param RequestContext request_context: (optional) The context the request was
+        made with, whose json_decoder decodes the error json
+    """
+    status_code = response.status_code
+    # Check to see if this is an invalid token error per
+    # https://canvas.instructure.com/doc/api/file.oauth.html
+    if status_code == 401 and 'WWW-Authenticate' in response.headers:
+        raise InvalidOAuthTokenError(
+            "OAuth Token used to make request to %s is invalid" % response.url)
+    try:
+        if request_context is None:
+            error_json = response.json()
+        else:
+            error_json = decode_json(request_context, response)
+        message = str(error_json)
+    except ValueError:  # no json object could be decoded, e.g. 404
+        error_json = None
+        message = response.text.strip()
+    raise CanvasAPIError(
+        status_code=status_code,
+        msg=message,
+        error_json=error_json,
+    )
+
+
 def get(request_context, url, payload=None, **optional_request_params):
     """
     Shortcut for making a GET call to the API.  Data is passed as url params.
@@ -72,11 +303,13 @@ def delete(request_context, url, payload=None, **optional_request_params):
 
 def call(action, url, request_context, params=None, data=None, max_retries=None,
          auth_token=None, files=None, headers=None, cookies=None, timeout=None,
-         proxies=None, verify=None, cert=None, allow_redirects=True):
+         proxies=None, verify=None, cert=None, allow_redirects=True,
+         idempotent=None, stream=False):
     """This method servers as a pass-through to the requests library request
     functionality, but provides some configurable default
     values.  Constructs and sends a :class:`requests.Request <Request>`.
-    Returns :class:`requests.Response <Response>` object.
+    Returns :class:`requests.Response <Response>` object, or an awaitable that
+    resolves to one when request_context is an :class:`AsyncRequestContext`.
 
     :param action: method for the new :class:`Request` object.
     :param url: Absolute url path to API method
@@ -88,8 +321,8 @@ def call(action, url, request_context, params=None, data=None, max_retries=None,
         the body of the :class:`Request`.
     :param int max_retries: (optional) Number of times a request that generates
         a certain class of HTTP exception will be retried before being raised
-        back to the caller.  See :py:mod:`client.base` for a list of those error
-        types.
+        back to the caller.  See :py:func:`is_retriable_error` for a description
+        of those error types.
     :param files: (optional) Dictionary of 'name': file-like-objects (or
         {'name': ('filename', fileobj)}) for multipart encoding upload.
     :param dictionary headers: (optional) dictionary of headers to send for each
@@ -97,7 +330,10 @@ def call(action, url, request_context, params=None, data=None, max_retries=None,
     :param cookies: (optional) Cookies to attach to each requests.
     :type cookies: dictionary or CookieJar
     :param str auth_token: (optional) OAuth2 token retrieved from a Canvas site
-    :param float timeout: (optional) The timeout of the request in seconds.
+    :param timeout: (optional) The timeout of the request in seconds, either
+        a single value or a (connect, read) tuple.  Defaults to the timeout the
+        request context has configured for the endpoint.
+    :type timeout: float or Tuple
     :param dictionary proxies: (optional) Mapping protocol to the URL of the
         proxy.
     :param verify: (optional) if ``True``, the SSL cert will be verified.  A
@@ -108,9 +344,30 @@ def call(action, url, request_context, params=None, data=None, max_retries=None,
     :type cert: str or Tuple
     :param bool allow_redirects: (optional) Set to True if POST/PUT/DELETE
         redirect following is allowed.  Defaults to True.
+    :param bool idempotent: (optional) Whether the request may safely be sent
+        more than once, which allows it to be retried after a network error
+        (see TRANSIENT_NETWORK_ERRORS).  Defaults to True for the actions in
+        IDEMPOTENT_ACTIONS, so e.g. a POST is only retried after a network
+        error if this is explicitly set to True.  Requests that failed to
+        connect (see :py:func:`is_connect_error`) are always retried since they
+        never reached Canvas.
+    :param bool stream: (optional) If ``True``, the body of a successful
+        response is not read before it is returned, so that it can be parsed as
+        it arrives (see :py:mod:`client.streaming`).  Streamed responses are
+        neither cached nor shared with coalesced requests.  Defaults to False.
     """
+    if isinstance(request_context, AsyncRequestContext):
+        # Requests made with an async context are sent by the asyncio transport;
+        # hand back the coroutine for the caller to await
+        return async_base.call(
+            action, url, request_context, params=params, data=data,
+            max_retries=max_retries, auth_token=auth_token, files=files,
+            headers=headers, cookies=cookies, timeout=timeout, proxies=proxies,
+            verify=verify, cert=cert, allow_redirects=allow_redirects,
+            idempotent=idempotent, stream=stream)
     # This will be a requests.Session object with defaults set for context
     canvas_session = request_context.session
+    throttle = request_context.throttle
     # Default back to value in request_context
     retries = max_retries or request_context.max_retries
     if retries is None:
@@ -119,45 +376,75 @@ def call(action, url, request_context, params=None, data=None, max_retries=None,
     auth = None
     if auth_token:
         auth = OAuth2Bearer(auth_token)
-    # try the request until max_retries is reached.  we need to account for the
-    # fact that the first iteration through isn't a retry, so add 1 to max_retries
-    for retry in range(retries + 1):
-        st = time.time()
-        try:
-            # build and send the request
-            response = canvas_session.request(
-                action, url, params=params, data=data, headers=headers,
-                cookies=cookies, files=files, auth=auth, timeout=timeout,
-                proxies=proxies, verify=verify, cert=cert,
-                allow_redirects=allow_redirects)
-
-            # raise an http exception if one occured
-            response.raise_for_status()
-
-        except HTTPError as http_error:
-            log.info("Caught an API Error returned by Canvas: %s", str(http_error))
-            # Need to check its an error code that can be retried
-            status_code = response.status_code
-
-            # Check to see if this is an invalid token error per
-            # https://canvas.instructure.com/doc/api/file.oauth.html
-            if status_code == 401 and 'WWW-Authenticate' in response.headers:
-                raise InvalidOAuthTokenError(
-                    "OAuth Token used to make request to %s is invalid" % response.url)
-
-            # If we can't retry the request, raise a CanvasAPIError
-            if status_code not in RETRY_ERROR_CODES or retry >= retries:
+    if idempotent is None:
+        idempotent = action.upper() in IDEMPOTENT_ACTIONS
+    if timeout is None:
+        timeout = request_context.get_timeout(action, url)
+    per_page = choose_per_page(request_context, action, url, params)
+    if per_page is not None:
+        params = dict(params, per_page=per_page)
+    # A streamed body can only be read once, so it is never cached
+    cache_key = None if stream else get_cache_key(request_context, action, url, params, auth_token)
+    cached = get_cached_entry(request_context, cache_key)
+    if cached is not None:
+        if cached.is_fresh:
+            return cached.response
+        # Revalidate the stale entry with a conditional request
+        headers = dict(headers or {}, **cached.conditional_headers)
+
+    def send():
+        delay = 0
+        # try the request until max_retries is reached.  we need to account for the
+        # fact that the first iteration through isn't a retry, so add 1 to max_retries
+        for retry in range(retries + 1):
+            if throttle:
+                throttle.acquire()
+            st = time.time()
+            try:
+                # build and send the request
                 try:
-                    error_json = response.json()
-                    message = str(error_json)
-                except ValueError:  # no json object could be decoded, e.g. 404
-                    error_json = None
-                    message = response.text.strip()
-                raise CanvasAPIError(
-                    status_code=status_code,
-                    msg=message,
-                    error_json=error_json,
-                )
-        else:
-            log.debug('API_CALL_DURATION {} {}'.format(url, time.time()-st))
-            return response
+                    response = canvas_session.request(
+                        action, url, params=params, data=data, headers=headers,
+                        cookies=cookies, files=files, auth=auth, timeout=timeout,
+                        proxies=proxies, verify=verify, cert=cert,
+                        allow_redirects=allow_redirects, stream=stream)
+                finally:
+                    if throttle:
+                        throttle.release()
+                if throttle:
+                    throttle.update(response)
+
+                # raise an http exception if one occured
+                response.raise_for_status()
+
+            except HTTPError as http_error:
+                log.info("Caught an API Error returned by Canvas: %s", str(http_error))
+                # If we can't retry the request, raise a CanvasAPIError (or an
+                # InvalidOAuthTokenError if the token was rejected)
+                if not is_retriable_error(response) or retry >= retries:
+                    raise_canvas_api_error(response, request_context)
+                delay = get_retry_delay(request_context, action, url, retry + 1, delay,
+                                        response=response, error=http_error)
+                if delay:
+                    time.sleep(delay)
+            except TRANSIENT_NETWORK_ERRORS as network_error:
+                log.info("Caught a network error calling Canvas: %s", str(network_error))
+                # A request that failed to connect never reached Canvas, so it is
+                # safe to retry whether or not it is idempotent
+                if not (idempotent or is_connect_error(network_error)) or retry >= retries:
+                    raise
+                delay = get_retry_delay(request_context, action, url, retry + 1, delay,
+                                        error=network_error)
+                if delay:
+                    time.sleep(delay)
+            else:
+                log.debug('API_CALL_DURATION {} {}'.format(url, time.time()-st))
+                if per_page is not None:
+                    request_context.update_per_page(url, response)
+                return update_cache(request_context, action, url, cache_key, response, cached)
+
+    # Join an identical GET that is already in flight instead of sending another
+    flight_key = get_coalescing_key(request_context, action, url, params, auth_token)
+    if flight_key is not None and not stream:
+        return request_context.single_flight.do(flight_key, send)
+    return send()
@@ -0,0 +1,330 @@
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+"""
+Response caches for idempotent GET requests.  A cache is enabled by passing it to a
+:class:`RequestContext <RequestContext>`, which decides what may be cached and for how long (see
+the cache and cache_ttls parameters); :py:func:`client.base.call` then serves repeated GETs from the
+cache and invalidates cached responses when a PUT, POST or DELETE to the same resource succeeds.
+:class:`MemoryCache` lives in a single process; :class:`SQLiteCache` keeps responses in a file that
+survives restarts and can be shared by several processes.
+With cache_revalidate, expired responses that carry an ETag or Last-Modified validator are kept and
+revalidated with a conditional request, and served again if Canvas answers 304 Not Modified.
+"""
+
+
+def build_cache_key(url, params=None, auth_token=None):
+    """
+    Build the key identifying a GET request: the url with its query string (including any params
+    and a masquerading as_user_id) in a canonical order, plus a digest of the OAuth2 token so that
+    users with different permissions never share cached responses.
+
+    :param str url: The absolute url of the request
+    :param params: (optional) Query parameters sent with the request
+    :type params: dictionary or list of tuples
+    :param str auth_token: (optional) The OAuth2 token the request is made with
+    :rtype: str
+    """
+    prepared = requests.PreparedRequest()
+    prepared.prepare_url(url, params)
+    parsed = urlparse(prepared.url)
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    token_digest = hashlib.sha256((auth_token or '').encode('utf-8')).hexdigest()[:16]
+    return '%s %s' % (token_digest, urlunparse(parsed._replace(query=query, fragment='')))
+
+
+def is_affected_path(cached_path, changed_path):
+    """
+    Whether a cached response for cached_path may be stale after the resource at changed_path was
+    modified: that is the resource itself, anything nested under it and the collection it belongs to.
+    For example a change to /api/v1/courses/1 affects /api/v1/courses/1, /api/v1/courses/1/users and
+    /api/v1/courses.
+
+    :param str cached_path: The url path of a cached response
+    :param str changed_path: The url path of a resource that was modified
+    :rtype: bool
+    """
+    changed_path = changed_path.rstrip('/')
+    cached_path = cached_path.rstrip('/')
+    return (cached_path == changed_path or cached_path.startswith(changed_path + '/') or
+            cached_path == changed_path.rpartition('/')[0])
+
+
+class CacheEntry(object):
+
+    """
+    A cached response together with the time it expires (as returned by time.time()), the url path it was
+    requested from, which is used for invalidation, and the ETag and Last-Modified validators that were returned
+    with it, which are used to revalidate it once it has expired.
+    """
+
+    __slots__ = ('response', 'expires', 'path', 'etag', 'last_modified')
+
+    def __init__(self, response, expires, path, etag=None, last_modified=None):
+        self.response = response
+        self.expires = expires
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def is_fresh(self):
+        return time.time() < self.expires
+
+    @property
+    def conditional_headers(self):
+        """
+        The If-None-Match and If-Modified-Since headers that revalidate this entry; empty if it has no validators.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class MemoryCache(object):
+
+    """
+    A thread-safe in-memory cache holding up to maxsize responses.  Expired entries are dropped when they are looked
+    up (unless they are being revalidated), and the least recently used entry is evicted when the cache is full.
+    hits and misses count lookups, which shows how much traffic the cache is taking off Canvas.
+
+    :param int maxsize: (optional) Maximum number of responses to keep
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise AttributeError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _process_lock(self):
+        # A lock held by another thread when the process forked is never released in the child,
+        # so a forked child starts over with a new one
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+        return self._lock
+
+    def get(self, key, allow_stale=False):
+        """
+        Return the fresh :class:`CacheEntry` stored under key, or None.  With allow_stale, an expired entry that can
+        be revalidated (see :attr:`CacheEntry.conditional_headers`) is returned as well.
+        """
+        with self._process_lock():
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if not entry.is_fresh:
+                self.misses += 1
+                if allow_stale and entry.conditional_headers:
+                    return entry
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        """
+        Store a :class:`CacheEntry` under key, evicting the least recently used entry if the cache is full.
+        """
+        with self._process_lock():
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove the entry stored under key, if any.
+        """
+        with self._process_lock():
+            self._entries.pop(key, None)
+
+    def invalidate(self, url):
+        """
+        Remove every entry that may be stale after the resource at url was modified (see :py:func:`is_affected_path`).
+
+        :param str url: Absolute url or url path of the modified resource
+        """
+        changed_path = urlparse(url).path
+        with self._process_lock():
+            stale_keys = [key for key, entry in self._entries.items() if is_affected_path(entry.path, changed_path)]
+            for key in stale_keys:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._process_lock():
+            self._entries.clear()
+
+    def __getstate__(self):
+        # Cached responses stay with the process that fetched them
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+class SQLiteCache(object):
+
+    """
+    A cache that stores responses in an SQLite database file, so that they survive restarts and can be shared by
+    every process (and thread) pointing at the same file.  It holds up to maxsize responses and evicts the least
+    recently used ones beyond that; expired entries are dropped when they are looked up (unless they are being
+    revalidated) and whenever a new response is stored.  hits and misses count the lookups made by this instance.
+
+    Only the status, headers and body of a response are stored, so the request attribute of a response served from
+    this cache is None.
+
+    :param str filename: Path of the database file, which is created if it does not exist
+    :param int maxsize: (optional) Maximum number of responses to keep
+    :param float timeout: (optional) Seconds to wait for another process to release a lock on the database
+    """
+
+    def __init__(self, filename, maxsize=10000, timeout=30.0):
+        if maxsize < 1:
+            raise AttributeError("maxsize must be at least 1.")
+        self.filename = filename
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._reset_connection_state()
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, path TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL, '
+                'etag TEXT, last_modified TEXT, status_code INTEGER NOT NULL, reason TEXT, url TEXT, '
+                'encoding TEXT, headers TEXT NOT NULL, content BLOB)')
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def _reset_connection_state(self):
+        """
+        (Re)create the per-thread connections, which must not be shared between threads or carried into a forked
+        child process.
+        """
+        self._pid = os.getpid()
+        self._local = threading.local()
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            self._reset_connection_state()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.filename, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key, allow_stale=False):
+        """
+        Return the fresh :class:`CacheEntry` stored under key, or None.  With allow_stale, an expired entry that can
+        be revalidated (see :attr:`CacheEntry.conditional_headers`) is returned as well.
+        """
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT path, expires, etag, last_modified, status_code, reason, url, encoding, headers, content '
+                'FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            entry = _load_entry(row)
+            if not entry.is_fresh:
+                self.misses += 1
+                if allow_stale and entry.conditional_headers:
+                    return entry
+                connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        """
+        Store a :class:`CacheEntry` under key, dropping expired entries that cannot be revalidated and evicting the
+        least recently used entries if the cache is full.
+        """
+        response = entry.response
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.path.rstrip('/'), entry.expires, now, entry.etag, entry.last_modified,
+                 response.status_code, response.reason, response.url, response.encoding,
+                 json.dumps(dict(response.headers)), response.content))
+            connection.execute(
+                'DELETE FROM responses WHERE expires <= ? AND etag IS NULL AND last_modified IS NULL', (now,))
+            connection.execute(
+                'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 '
+                'OFFSET ?)', (self.maxsize,))
+
+    def delete(self, key):
+        """
+        Remove the entry stored under key, if any.
+        """
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def invalidate(self, url):
+        """
+        Remove every entry that may be stale after the resource at url was modified (see :py:func:`is_affected_path`).
+
+        :param str url: Absolute url or url path of the modified resource
+        """
+        changed_path = urlparse(url).path.rstrip('/')
+        with self._connection() as connection:
+            connection.execute(
+                'DELETE FROM responses WHERE path = ? OR substr(path, 1, ?) = ? OR path = ?',
+                (changed_path, len(changed_path) + 1, changed_path + '/', changed_path.rpartition('/')[0]))
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses')
+
+    def __getstate__(self):
+        # Connections stay with the thread that opened them; the copy reopens the same file
+        return {'filename': self.filename, 'maxsize': self.maxsize, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def _load_entry(row):
+    path, expires, etag, last_modified, status_code, reason, url, encoding, headers, content = row
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response.url = url
+    response.encoding = encoding
+    response.headers = CaseInsensitiveDict(json.loads(headers))
+    response._content = content
+    return CacheEntry(response, expires, path, etag=etag, last_modified=last_modified)
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+
+"""
+Single-flight coalescing of identical requests.  When several threads (or asyncio tasks) make the
+same GET through a :class:`RequestContext <RequestContext>` at the same moment, only the first one is
+sent to Canvas and the others wait for, and share, its response (see the coalesce_requests
+parameter of the context).
+"""
+
+
+class _Flight(object):
+
+    """
+    A call in progress, and its outcome once it has finished.
+    """
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+
+    """
+    Runs at most one call per key at a time.  Callers that ask for a key whose call is already in progress wait for
+    it to finish and receive the same result, or have the same exception raised.  coalesced counts the callers that
+    were spared a call this way.  A single instance may be shared by every thread (or asyncio task) that uses a
+    context.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._reset_flight_state()
+
+    def _reset_flight_state(self):
+        """
+        (Re)create the lock and the calls in progress, which belong to a single process.  Calls in progress in a parent
+        process never finish in a forked child, so nothing may wait for them there.
+        """
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._tasks = {}
+
+    def __getstate__(self):
+        return {'coalesced': self.coalesced}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_flight_state()
+
+    def do(self, key, function):
+        """
+        Return the result of function(), unless a call for key is already in progress, in which case wait for it
+        and return its result instead.
+
+        :param str key: Identifies calls that are interchangeable
+        :param function: Callable taking no arguments
+        """
+        if self._pid != os.getpid():
+            self._reset_flight_state()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def async_do(self, key, function):
+        """
+        Awaitable equivalent of :meth:`do` for use from an event loop.  function must return an awaitable; it runs
+        as a task of its own, so that a caller being cancelled does not cancel the call the others are waiting for.
+
+        :param str key: Identifies calls that are interchangeable
+        :param function: Callable taking no arguments and returning an awaitable
+        """
+        if self._pid != os.getpid():
+            self._reset_flight_state()
+        # Tasks belong to the loop that runs them, so calls are only shared within a loop.  Called from a
+        # coroutine, get_event_loop returns the running loop (get_running_loop needs Python 3.7)
+        task_key = (asyncio.get_event_loop(), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(function())
+                task.add_done_callback(lambda finished: self._finish_task(task_key, finished))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish_task(self, task_key, task):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        if not task.cancelled():
+            task.exception()  # Mark the exception as retrieved should every caller have been cancelled
@@ -0,0 +1,86 @@
+import re
+from urllib.parse import unquote, urlparse
+
+"""
+Helpers for configuring behavior per Canvas API endpoint.  Endpoints are identified by the path
+templates used in :py:mod:`canvas_sdk.methods` (e.g. '/v1/accounts/{account_id}/reports/{report}'),
+optionally prefixed by an http method (e.g. 'POST /v1/accounts/{account_id}/reports/{report}').
+"""
+
+_PLACEHOLDER = re.compile(r'\\\{[^}]*\\\}')
+# Path segments that identify an object rather than an endpoint: numeric ids, 'self' and SIS style
+# ids such as 'sis_course_id:A1'
+_ID_SEGMENT = re.compile(r'^(\d+|self|[a-z_]+:.+)$')
+
+
+def compile_endpoint(template):
+    """
+    Compile an endpoint template into an (action, regex) pair.  Each {placeholder} in the template
+    matches a single path segment; action is None if the template has no http method prefix.
+
+    :param str template: The endpoint path template, optionally prefixed by an http method
+    :rtype: tuple
+    """
+    action, _, path = template.strip().rpartition(' ')
+    pattern = _PLACEHOLDER.sub('[^/]+', re.escape(path.rstrip('/')))
+    return (action.upper() or None), re.compile('^%s/?$' % pattern)
+
+
+def endpoint_template(path):
+    """
+    Replace the object ids in a url path with {id}, which gives the same template for every request to an endpoint,
+    e.g. '/v1/courses/{id}/users' for '/v1/courses/1234/users' and '/v1/courses/sis_course_id:A1/users'.
+
+    :param str path: The url path of a request
+    :rtype: str
+    """
+    return '/'.join('{id}' if _ID_SEGMENT.match(unquote(segment)) else segment for segment in path.split('/'))
+
+
+class EndpointMap(object):
+
+    """
+    Map endpoint templates to values (timeouts, cache lifetimes, ...) and look up the value configured for a request.
+    Templates qualified by an http method take precedence over unqualified ones; otherwise templates are tried in
+    the order they were given.
+
+    :param str base_api_url: The api endpoint of the Canvas site, which is stripped from request urls before matching
+    :param dictionary mapping: Endpoint templates mapped to values
+    """
+
+    def __init__(self, base_api_url, mapping=None):
+        self.base_path = urlparse(base_api_url).path.rstrip('/')
+        entries = [(compile_endpoint(template), value) for template, value in (mapping or {}).items()]
+        # Stable sort so method qualified templates are tried first
+        self._entries = sorted(entries, key=lambda entry: entry[0][0] is None)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def endpoint_path(self, url):
+        """
+        Return the path of a request url relative to the base api url, e.g. '/v1/courses/1'
+        """
+        path = urlparse(url).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):]
+        return path
+
+    def match(self, action, url, default=None):
+        """
+        Return the value of the first template matching the request, or default if none match.
+
+        :param str action: The http method of the request
+        :param str url: The absolute url of the request
+        :param default: (optional) Value returned when no template matches
+        """
+        if not self._entries:
+            return default
+        path = self.endpoint_path(url)
+        action = action.upper()
+        for (template_action, regex), value in self._entries:
+            if template_action not in (None, action):
+                continue
+            if regex.match(path):
+                return value
+        return default
@@ -1,7 +1,14 @@
 # request_context.py
+import os
+import threading
+import weakref
+
 import requests
+from requests.adapters import HTTPAdapter
 from .auth import OAuth2Bearer
-from urllib.parse import urlparse
+from .coalesce import SingleFlight
+from .endpoints import EndpointMap, endpoint_template
+from urllib.parse import parse_qsl, urlparse
 
 
 class RequestContext(object):
@@ -15,17 +22,69 @@ class RequestContext(object):
     :param str auth_token: OAuth2 token retrieved from a Canvas site
     :param str base_api_url: The api endpoint of the Canvas site in the form "http(s)://[canvas.site.com]/api"
     :param int per_page: (optional) For get requests that return a list of data, this will be used as the default per_page value
+    :param bool adaptive_per_page: (optional) If ``True``, list requests made without a per_page (neither passed to the
+        method nor set as the context default) ask for max_per_page items, and the page size Canvas actually honored
+        is learned per endpoint from the per_page of the pagination links it returns and requested from then on.  This
+        avoids paging through Canvas's default of 10 items per page.  Defaults to False.
+    :param int max_per_page: (optional) The page size requested from an endpoint by adaptive_per_page before Canvas
+        has answered.  Defaults to 100, the maximum most Canvas endpoints allow.
     :param int max_retries: (optional) Number of times a request that generates a certain class of HTTP exception will be retried
         before being raised back to the caller.  See :py:mod:`client.base` for a list of those error types.
     :param dictionary headers: (optional) dictionary of headers to send for each request.  Will be merged with a default set of headers.
     :param cookies: (optional) Cookies to attach to each requests.
     :type cookies: dictionary or CookieJar
-    :param float timeout: (optional) The timeout of the request in seconds.
+    :param timeout: (optional) The timeout of each request in seconds, either a single value used for both connecting
+        and reading or a (connect, read) tuple.  Requests wait forever if None.
+    :type timeout: float or Tuple
+    :param dictionary endpoint_timeouts: (optional) Timeouts for specific endpoints, overriding timeout.  Keys are the
+        endpoint path templates used in :py:mod:`canvas_sdk.methods`, optionally prefixed by an http method, e.g.
+        ``{'POST /v1/accounts/{account_id}/reports/{report}': (5, 300)}``.  See :class:`EndpointMap`.
     :param dictionary proxies: (optional) Mapping protocol to the URL of the proxy.
     :param verify: (optional) if ``True``, the SSL cert will be verified.  A CA_BUNDLE path can also be provided.
     :type verify: boolean or str
     :param cert: (optional) if String, path to ssl client cert file (.pem).  If Tuple, ('cert', 'key') pair.
     :type cert: str or Tuple
+    :param throttle: (optional) Limits concurrent requests made with this context based on the rate limit headers
+        returned by Canvas.  See :class:`RateLimitThrottle <canvas_sdk.client.throttle.RateLimitThrottle>`.
+    :type throttle: :class:`RateLimitThrottle` or None
+    :param backoff: (optional) Policy that decides how long to wait before retrying a failed request.  Retries are
+        sent immediately if None.  See :py:mod:`client.retry` for the available policies.
+    :type backoff: :class:`BackoffPolicy` or None
+    :param int pool_connections: (optional) Number of per-host connection pools to cache.  Defaults to 10.
+    :param int pool_maxsize: (optional) Maximum number of connections to keep open to each host.  Size this to the
+        number of threads sharing the context so that requests reuse open connections instead of paying for a new
+        TCP/TLS handshake; see :meth:`pool_stats`.  Defaults to 10.
+    :param bool pool_block: (optional) If ``True``, wait for a pooled connection to become free instead of opening
+        (and afterwards discarding) an extra one when all pool_maxsize connections are busy.  Defaults to False.  An
+        :class:`AsyncRequestContext` always waits, so it never has more than pool_maxsize connections open to a host.
+    :param cache: (optional) Cache for the responses of GET requests, e.g. a
+        :class:`MemoryCache <canvas_sdk.client.cache.MemoryCache>`, or a
+        :class:`SQLiteCache <canvas_sdk.client.cache.SQLiteCache>` to keep responses across restarts and share them
+        between processes.  Cached responses are served instead of repeating identical requests (same url, params,
+        masquerading user and token) until they expire, and are invalidated when a PUT, POST or DELETE to the same
+        resource succeeds.
+    :param int cache_ttl: (optional) Number of seconds GET responses are cached for when no cache_ttls entry matches.
+        Defaults to 0, meaning only the endpoints listed in cache_ttls are cached.
+    :param dictionary cache_ttls: (optional) Number of seconds to cache responses of specific endpoints for, keyed by
+        endpoint path template as for endpoint_timeouts, e.g. ``{'/v1/accounts/{account_id}/roles': 3600}``.
+    :param bool cache_revalidate: (optional) If ``True``, responses that carry an ETag or Last-Modified header are
+        kept in the cache after they expire and revalidated with an If-None-Match/If-Modified-Since request; a 304
+        Not Modified answer is served from the cache without downloading the body again.  With a ttl of 0, every
+        request is revalidated this way.  Defaults to False.
+    :param bool coalesce_requests: (optional) If ``True``, identical GETs (same url, params, masquerading user and
+        token) made through the context while one is already in flight, e.g. by many threads handling launches for
+        the same course, wait for and share that request's response instead of each being sent to Canvas.  The
+        shared :class:`requests.Response` is handed to every caller, so it should not be modified.  Defaults to False.
+    :param json_decoder: (optional) Callable used to decode json response bodies, e.g. in
+        :py:func:`canvas_sdk.utils.get_all_list_data` and for error responses.  It is passed the raw bytes of the
+        body.  Use :data:`fast_json_decoder <canvas_sdk.client.json_decoders.fast_json_decoder>` to decode with
+        orjson when it is installed and the standard library otherwise.  Defaults to None, meaning response.json().
+    :param bool per_thread_sessions: (optional) If ``True``, each thread using the context gets its own
+        requests.Session (and connection pool) instead of all threads sharing one, since requests.Session is not
+        documented as thread-safe.  Use this when sharing a context across a thread pool.  Defaults to False.
+    :param on_retry: (optional) Callable invoked with a :class:`RetryAttempt <canvas_sdk.client.retry.RetryAttempt>`
+        each time a request is about to be retried, e.g. to report retry counts and delays as metrics.
+    :type on_retry: callable or None
     """
 
     @classmethod
@@ -39,10 +98,21 @@ class RequestContext(object):
         }
         return default_headers
 
-    def __init__(self, auth_token, base_api_url, max_retries=0, per_page=None, headers=None, cookies=None, timeout=None, proxies=None, verify=True, cert=None):
-        self._session = None
+    def __init__(self, auth_token, base_api_url, max_retries=0, per_page=None, headers=None, cookies=None, timeout=None, proxies=None, verify=True, cert=None, throttle=None, backoff=None, on_retry=None, endpoint_timeouts=None, pool_connections=10, pool_maxsize=10, pool_block=False, per_thread_sessions=False, cache=None, cache_ttl=0, cache_ttls=None, cache_revalidate=False, coalesce_requests=False, adaptive_per_page=False, max_per_page=100, json_decoder=None):
+        self._reset_connection_state()
+        self.per_thread_sessions = per_thread_sessions
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.cache_ttls = EndpointMap(base_api_url, cache_ttls)
+        self.cache_revalidate = cache_revalidate
+        self.single_flight = SingleFlight() if coalesce_requests else None
         self.auth_token = auth_token
         self.per_page = per_page
+        self.adaptive_per_page = adaptive_per_page
+        self.max_per_page = max_per_page
+        # The page size Canvas honored for each endpoint, keyed by endpoint template
+        self.per_page_limits = {}
+        self.json_decoder = json_decoder
         parsed_url = urlparse(base_api_url)
         if 'http' not in parsed_url.scheme:
             raise AttributeError(
@@ -54,10 +124,51 @@ class RequestContext(object):
             self.headers.update(headers)
         self.cookies = cookies
         self.timeout = timeout
+        self.endpoint_timeouts = EndpointMap(base_api_url, endpoint_timeouts)
         self.proxies = proxies
         self.verify = verify
         self.cert = cert
         self.max_retries = max_retries
+        self.throttle = throttle
+        self.backoff = backoff
+        self.on_retry = on_retry
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+
+    # Attributes holding sessions, locks and other per process state that are never pickled
+    _connection_state_attributes = (
+        '_pid', '_session', '_lock', '_local', '_generation', '_thread_sessions', '_retired_pool_stats')
+
+    def _reset_connection_state(self):
+        """
+        Drop any sessions and (re)create the locks and other state that can't be shared with another process.  This is
+        done on creation, when unpickling and when the context is first used in a child process after a fork, so that
+        a forked worker never reuses the connections of its parent.
+        """
+        self._pid = os.getpid()
+        self._session = None
+        # Guards lazy creation of the shared session and the generation counter used to
+        # expire per thread sessions
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._thread_sessions = weakref.WeakSet()
+        # Pool counts of the sessions of threads that have since exited, see pool_stats
+        self._retired_pool_stats = {'requests': 0, 'new_connections': 0}
+
+    def __getstate__(self):
+        """
+        Pickle the configuration of the context without its sessions, e.g. to send it to a multiprocessing worker.
+        """
+        state = self.__dict__.copy()
+        for attribute in self._connection_state_attributes:
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_connection_state()
 
     @property
     def auth(self):
@@ -66,6 +177,59 @@ class RequestContext(object):
         """
         return OAuth2Bearer(self.auth_token)
 
+    def get_timeout(self, action, url):
+        """
+        Return the timeout to use for a request: the matching entry of endpoint_timeouts if there is one, otherwise
+        the context timeout.  requests.Session has no default timeout, so this is passed along with every request.
+
+        :param str action: The http method of the request
+        :param str url: The absolute url of the request
+        :rtype: float, Tuple or None
+        """
+        timeout = self.endpoint_timeouts.match(action, url, self.timeout)
+        if isinstance(timeout, list):  # e.g. loaded from a json settings file
+            timeout = tuple(timeout)
+        return timeout
+
+    def get_cache_ttl(self, url):
+        """
+        Return the number of seconds the response to a GET of url may be cached for: the matching entry of cache_ttls
+        if there is one, otherwise cache_ttl.  A value of 0 (or None) means the response is not cached, or, with
+        cache_revalidate, that it is revalidated every time.
+
+        :param str url: The absolute url of the request
+        :rtype: int
+        """
+        return self.cache_ttls.match('GET', url, self.cache_ttl)
+
+    def get_per_page(self, url):
+        """
+        Return the page size to request from a list endpoint when neither the caller nor the context chose one: with
+        adaptive_per_page, the page size Canvas honored the last time the endpoint was requested, or max_per_page if
+        it hasn't been yet; otherwise None, leaving Canvas's default.
+
+        :param str url: The absolute url of the request
+        :rtype: int or None
+        """
+        if not self.adaptive_per_page:
+            return None
+        return self.per_page_limits.get(endpoint_template(urlparse(url).path), self.max_per_page)
+
+    def update_per_page(self, url, response):
+        """
+        Remember the page size Canvas honored for a list request sent with the page size from :meth:`get_per_page`.
+        Canvas clamps per_page to the maximum the endpoint allows and includes the result in its pagination links.
+
+        :param str url: The absolute url of the request
+        :param response: The response to the request
+        :type response: :class:`requests.Response`
+        """
+        for link in response.links.values():
+            per_page = dict(parse_qsl(urlparse(link.get('url', '')).query)).get('per_page', '')
+            if per_page.isdigit():
+                self.per_page_limits[endpoint_template(urlparse(url).path)] = int(per_page)
+                return
+
     @property
     def session(self):
         """
@@ -75,32 +239,104 @@ class RequestContext(object):
         the session object: http://docs.python-requests.org/
         NOTE: Refer to the setup.py file to match up the version of the Requests library the SDK uses
         with the right doc version.
+        When the context was created with per_thread_sessions, each thread gets (and sets) its own session.
+        If the context is used in a process forked after its session was created, a new session is created.
         """
+        if self._pid != os.getpid():
+            self._reset_connection_state()
+        if self.per_thread_sessions:
+            local = self._local
+            if getattr(local, 'generation', None) != self._generation or not local.session:
+                session = self._build_session()
+                self.session = session
+                self._thread_sessions.add(session)
+                # Keep the pool counts of the session once its thread exits and it is garbage collected
+                weakref.finalize(session, _add_pool_counts, self._retired_pool_stats, list(session.adapters.values()))
+            return local.session
         if not self._session:
-            self._session = requests.Session()
-            # Streaming is disabled by default when creating a requests.Session
-            # object, but let's be explicit here to prevent connections from staying
-            # open indefinitely
-            self._session.stream = False
-            self._session.auth = self.auth
-            self._session.headers.update(self.headers or {})
-            self._session.timeout = self.timeout
-            self._session.cert = self.cert
-            self._session.verify = self.verify
-            # We only need to set proxies and cookies if not None or empty since the
-            # defaults are empty dicts
-            if self.proxies:
-                self._session.proxies = self.proxies
-            if self.cookies:
-                self._session.cookies = self.cookies
+            # Lock so that threads racing on first use don't each create a session
+            with self._lock:
+                if not self._session:
+                    self._session = self._build_session()
         return self._session
 
     @session.setter
     def session(self, sess):
-        self._session = sess
+        if self.per_thread_sessions:
+            self._local.session = sess
+            self._local.generation = self._generation
+        else:
+            self._session = sess
+
+    def _build_session(self):
+        """
+        Create a new requests.Session configured with the session related values passed into the class.
+        """
+        session = requests.Session()
+        # Streaming is disabled by default when creating a requests.Session
+        # object, but let's be explicit here to prevent connections from staying
+        # open indefinitely
+        session.stream = False
+        session.auth = self.auth
+        session.headers.update(self.headers or {})
+        session.cert = self.cert
+        session.verify = self.verify
+        # Replace the default adapters so the connection pools are sized as configured
+        for prefix in ('https://', 'http://'):
+            session.mount(prefix, HTTPAdapter(
+                pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block))
+        # We only need to set proxies and cookies if not None or empty since the
+        # defaults are empty dicts
+        if self.proxies:
+            session.proxies = self.proxies
+        if self.cookies:
+            session.cookies = self.cookies
+        return session
+
+    def pool_stats(self):
+        """
+        Report how well the connection pools of the session are being reused.  Returns a dictionary with the number of
+        ``requests`` sent, the number of ``new_connections`` opened for them and the number of ``reused_connections``
+        (requests sent over an already open connection), summed over the sessions of all threads when using
+        per_thread_sessions.  Counts are kept by the underlying urllib3 pools, so they reset when the session is
+        expired or a pool is evicted (see pool_connections).
+
+        :rtype: dictionary
+        """
+        if self.per_thread_sessions:
+            sessions = list(self._thread_sessions)
+            stats = dict(self._retired_pool_stats)
+        else:
+            sessions = [self._session] if self._session else []
+            stats = {'requests': 0, 'new_connections': 0}
+        for session in sessions:
+            _add_pool_counts(stats, session.adapters.values())
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        return stats
 
     def expire_session(self):
         """
-        To expire a session, it just needs to be set to None according to requests doc.
+        To expire a session, it just needs to be set to None according to requests doc.  With per_thread_sessions,
+        the sessions of all threads are expired and each thread creates a new one on its next request.
         """
-        self.session = None
+        with self._lock:
+            self._generation += 1
+            self._thread_sessions = weakref.WeakSet()
+            self._retired_pool_stats = {'requests': 0, 'new_connections': 0}
+            self._session = None
+
+
+def _add_pool_counts(stats, adapters):
+    """
+    Add the request and connection counts of the urllib3 pools behind the given transport adapters to stats.
+    """
+    for adapter in adapters:
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['requests'] += pool.num_requests
+            stats['new_connections'] += pool.num_connections
@@ -0,0 +1,129 @@
+import collections
+import datetime
+import email.utils
+import random
+
+"""
+Backoff policies that control how long :py:func:`client.base.call` waits before retrying a request.
+"""
+
+RetryAttempt = collections.namedtuple(
+    'RetryAttempt', ['action', 'url', 'attempt', 'status_code', 'error', 'delay'])
+RetryAttempt.__doc__ = """
+Record of a failed request that is about to be retried, passed to the on_retry callback of a
+:class:`RequestContext <RequestContext>`.  attempt is the number of the retry about to be made
+(starting at 1), status_code is None when the request failed without a response, error is the
+exception that was caught and delay is the number of seconds that will be waited before retrying.
+"""
+
+
+def parse_retry_after(response):
+    """
+    Return the number of seconds the Retry-After header of a response asks the client to wait, or
+    None if the header is missing or malformed.  Both the delay-seconds and HTTP-date forms are
+    supported.
+
+    :param response: The response returned by Canvas
+    :type response: :class:`requests.Response`
+    :rtype: float or None
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class BackoffPolicy(object):
+
+    """
+    Base class for backoff policies.  Subclasses implement :meth:`compute_delay`; the policies are
+    stateless so that a single instance can be shared by every request made with a context.
+
+    :param float max_delay: (optional) Upper bound, in seconds, of any computed delay
+    :param bool respect_retry_after: (optional) If ``True``, wait at least as long as the Retry-After
+        header of the failed response asks for (even if that exceeds max_delay)
+    """
+
+    def __init__(self, max_delay=60.0, respect_retry_after=True):
+        self.max_delay = max_delay
+        self.respect_retry_after = respect_retry_after
+
+    def compute_delay(self, attempt, previous_delay):
+        """
+        Compute the delay before the given retry.
+
+        :param int attempt: Number of the retry about to be made, starting at 1
+        :param float previous_delay: The delay used before the previous retry (0 for the first retry)
+        :rtype: float
+        """
+        raise NotImplementedError
+
+    def get_delay(self, attempt, previous_delay=0.0, response=None):
+        """
+        Return the number of seconds to wait before the given retry, capped at max_delay unless the
+        failed response carries a longer Retry-After.
+
+        :param int attempt: Number of the retry about to be made, starting at 1
+        :param float previous_delay: The delay used before the previous retry (0 for the first retry)
+        :param response: (optional) The failed response, if one was received
+        :type response: :class:`requests.Response` or None
+        :rtype: float
+        """
+        delay = min(self.compute_delay(attempt, previous_delay), self.max_delay)
+        if self.respect_retry_after and response is not None:
+            retry_after = parse_retry_after(response)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+
+class ExponentialBackoff(BackoffPolicy):
+
+    """
+    Wait base * multiplier ** (attempt - 1) seconds before each retry.  With jitter enabled ("full jitter") the
+    actual delay is drawn uniformly between zero and that value, so that workers that failed together don't
+    retry in lockstep.
+
+    :param float base: (optional) Delay, in seconds, before the first retry
+    :param float multiplier: (optional) Factor the delay grows by with each retry
+    :param bool jitter: (optional) Randomize each delay between zero and the computed value
+    """
+
+    def __init__(self, base=0.5, multiplier=2.0, jitter=True, **kwargs):
+        super(ExponentialBackoff, self).__init__(**kwargs)
+        self.base = base
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def compute_delay(self, attempt, previous_delay):
+        delay = min(self.base * self.multiplier ** (attempt - 1), self.max_delay)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class DecorrelatedJitterBackoff(BackoffPolicy):
+
+    """
+    "Decorrelated jitter": each delay is drawn uniformly between base and three times the previous delay, which
+    spreads out retries from many clients while still growing roughly exponentially.
+
+    :param float base: (optional) Minimum delay, in seconds, before any retry
+    """
+
+    def __init__(self, base=0.5, **kwargs):
+        super(DecorrelatedJitterBackoff, self).__init__(**kwargs)
+        self.base = base
+
+    def compute_delay(self, attempt, previous_delay):
+        return random.uniform(self.base, max(self.base, previous_delay * 3))
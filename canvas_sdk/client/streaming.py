@@ -0,0 +1,99 @@
+import codecs
+import json
+
+"""
+Incremental parsing of the json arrays returned by list endpoints.  A response requested with
+stream=True (see :py:func:`client.base.call`) is read off the socket a chunk at a time and the
+elements of its array are generated as soon as each one is complete, so only one element, rather
+than the whole page, is held in memory at a time.
+"""
+
+# Bytes read from the socket at a time
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+# Characters that may continue a number that raw_decode stopped short of, e.g. after '87.' or '1e-'
+_NUMBER_CHARACTERS = '0123456789.eE+-'
+
+
+def iter_json_array(chunks):
+    """
+    Generate the elements of the json array whose text is split across chunks, parsing each element as soon as the
+    chunks received contain all of it, and the separator that follows it.
+
+    :param chunks: Consecutive pieces of the text of a json array
+    :type chunks: iterable of str
+    :raises ValueError: If the text is not a json array, or ends before the array does
+    :rtype: iterator
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    # Whether no element has been parsed yet, so that the ']' may follow the '[' directly; otherwise each ',' is
+    # consumed along with the element before it, and an element must follow it
+    first = True
+    for chunk in chunks:
+        # Drop the text that has been parsed already
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            character = buffer[position]
+            if not started:
+                if character != '[':
+                    raise ValueError('Expected a json array, found %r' % buffer[position:position + 20])
+                started = True
+                position += 1
+                continue
+            if character == ']' and first:
+                return
+            if character in ',]':
+                raise ValueError('Expected a json value, found %r' % buffer[position:position + 20])
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break  # The element continues in the next chunk
+            # Only accept the element once the separator after it has arrived, since a number at the end of the
+            # buffer, or cut short after its '.' or exponent, may continue in the next chunk
+            separator = end
+            while separator < len(buffer) and buffer[separator] in _WHITESPACE:
+                separator += 1
+            if separator == len(buffer):
+                break
+            if buffer[separator] not in ',]':
+                if separator == end and all(character in _NUMBER_CHARACTERS for character in buffer[end:]):
+                    break
+                raise ValueError('Expected , or ] after an array element, found %r' % buffer[separator:separator + 20])
+            yield element
+            first = False
+            if buffer[separator] == ']':
+                return
+            position = separator + 1
+    # Parse what is left to raise the actual error, e.g. for malformed json
+    decoder.raw_decode(buffer, position)
+    raise ValueError('The json array ended unexpectedly')
+
+
+def iter_response_items(response, chunk_size=CHUNK_SIZE):
+    """
+    Generate the elements of the json array in the body of a response requested with stream=True as they are read
+    off the socket.  The response is closed, returning its connection to the pool, once the array has been read or
+    the caller stops early.
+
+    :param response: A response to a list request, whose body has not been read
+    :type response: :class:`requests.Response`
+    :param int chunk_size: (optional) Number of bytes to read from the socket at a time
+    :rtype: iterator
+    """
+    # Canvas sends utf-8; decode incrementally so that characters split across chunks survive
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size))
+    try:
+        yield from iter_json_array(chunks)
+    finally:
+        response.close()
@@ -0,0 +1,191 @@
+import asyncio
+import collections
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+RATE_LIMIT_REMAINING_HEADER = 'X-Rate-Limit-Remaining'
+REQUEST_COST_HEADER = 'X-Request-Cost'
+
+
+def is_rate_limit_error(response):
+    """
+    Canvas signals that the rate limit bucket has run dry with a 403 "Rate Limit Exceeded"
+    response (see https://canvas.instructure.com/doc/api/file.throttling.html).  Unlike other
+    403s, the request can be retried once the bucket has refilled.
+
+    :param response: The response returned by Canvas
+    :type response: :class:`requests.Response`
+    :rtype: bool
+    """
+    return response.status_code == 403 and 'Rate Limit Exceeded' in response.text
+
+
+class RateLimitThrottle(object):
+
+    """
+    Limits the number of concurrent requests made with a :class:`RequestContext <RequestContext>` based on the
+    rate limit headers Canvas returns with every response.  While X-Rate-Limit-Remaining stays above high_water the
+    full max_concurrency is allowed; as it drops towards low_water the number of concurrent requests shrinks
+    linearly down to one, and once it is at or below low_water each request also waits for cooldown seconds so that
+    the bucket can refill.  A single instance may be shared by every thread (or asyncio task) that uses a context.
+
+    :param int max_concurrency: (optional) Number of concurrent requests allowed while the bucket is healthy
+    :param float high_water: (optional) Remaining quota at or above which max_concurrency is allowed
+    :param float low_water: (optional) Remaining quota at or below which requests are serialized and delayed
+    :param float cooldown: (optional) Seconds to wait before each request once remaining quota is at or below
+        low_water
+    """
+
+    def __init__(self, max_concurrency=10, high_water=300.0, low_water=50.0, cooldown=1.0):
+        if max_concurrency < 1:
+            raise AttributeError("max_concurrency must be at least 1.")
+        if low_water >= high_water:
+            raise AttributeError("low_water must be lower than high_water.")
+        self.max_concurrency = max_concurrency
+        self.high_water = high_water
+        self.low_water = low_water
+        self.cooldown = cooldown
+        self.concurrency = max_concurrency
+        self.remaining = None
+        self.request_cost = None
+        self._reset_concurrency_state()
+
+    def _reset_concurrency_state(self):
+        """
+        (Re)create the lock and in flight count, which belong to a single process.  Requests in flight in a parent
+        process never finish in a forked child, so the count starts over there.
+        """
+        self._pid = os.getpid()
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        # (loop, future) of each coroutine waiting in async_acquire, in the order they started waiting
+        self._async_waiters = collections.deque()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute in ('_pid', '_condition', 'in_flight', '_async_waiters'):
+            state.pop(attribute)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_concurrency_state()
+
+    def update(self, response):
+        """
+        Read the rate limit headers of a response and adjust the allowed concurrency accordingly.
+
+        :param response: The response returned by Canvas
+        :type response: :class:`requests.Response`
+        """
+        headers = response.headers
+        remaining = _float_header(headers, RATE_LIMIT_REMAINING_HEADER)
+        if is_rate_limit_error(response):
+            remaining = 0.0
+        with self._condition:
+            self.request_cost = _float_header(headers, REQUEST_COST_HEADER)
+            if remaining is None:
+                return
+            self.remaining = remaining
+            if remaining >= self.high_water:
+                concurrency = self.max_concurrency
+            elif remaining <= self.low_water:
+                concurrency = 1
+            else:
+                fraction = (remaining - self.low_water) / (self.high_water - self.low_water)
+                concurrency = 1 + int((self.max_concurrency - 1) * fraction)
+            if concurrency != self.concurrency:
+                log.debug('Rate limit remaining %s, allowing %s concurrent requests', remaining, concurrency)
+                self.concurrency = concurrency
+                self._condition.notify_all()
+                for _ in range(self.concurrency - self.in_flight):
+                    self._wake_async_waiter()
+
+    @property
+    def delay(self):
+        """
+        Seconds a request should wait before being sent, given the last known remaining quota
+        """
+        if self.remaining is not None and self.remaining <= self.low_water:
+            return self.cooldown
+        return 0
+
+    def acquire(self):
+        """
+        Block until a request may be sent.  Each call must be paired with a call to :meth:`release`.
+        """
+        if self._pid != os.getpid():
+            self._reset_concurrency_state()
+        with self._condition:
+            while self.in_flight >= self.concurrency:
+                self._condition.wait()
+            self.in_flight += 1
+        delay = self.delay
+        if delay:
+            time.sleep(delay)
+
+    async def async_acquire(self):
+        """
+        Awaitable equivalent of :meth:`acquire` for use from an event loop.  Coroutines waiting for a slot are
+        suspended until :meth:`release` or :meth:`update` frees one, whichever thread or event loop that happens on.
+        """
+        if self._pid != os.getpid():
+            self._reset_concurrency_state()
+        # Called from a coroutine, get_event_loop returns the running loop (get_running_loop needs Python 3.7)
+        loop = asyncio.get_event_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < self.concurrency:
+                    self.in_flight += 1
+                    break
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        # This waiter was woken for a free slot it will not take; pass it on
+                        self._wake_async_waiter()
+                raise
+        delay = self.delay
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _wake_async_waiter(self):
+        """
+        Wake the coroutine that has been waiting longest in async_acquire, if any, so that it checks for a free slot.
+        Must be called with the condition held.
+        """
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, future)
+                return
+
+    def release(self):
+        """
+        Mark a request started with :meth:`acquire` as finished.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+            self._wake_async_waiter()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _float_header(headers, name):
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,135 @@
+import array
+import sys
+
+from canvas_sdk import utils
+from canvas_sdk.client.json_decoders import decode_json
+
+"""
+Collection of paginated list results into columns, for analytics over large exports.  Rather than
+building the list of item dicts returned by :py:func:`canvas_sdk.utils.get_all_list_data` and
+converting it afterwards, which holds both copies at once, the items of each page are appended
+straight into one buffer per field as the page arrives.  Numeric fields are kept in arrays, which
+support the buffer protocol, so e.g. ``numpy.frombuffer(columns['score'])`` uses the scores
+without copying them.
+"""
+
+
+class Column(object):
+
+    """
+    A field of the items of a list endpoint, and the buffer its values are appended to.  With a typecode (see
+    :py:mod:`array`), values are stored in an array of that type, and missing or null values are stored as missing:
+    NaN for the float typecodes 'f' and 'd', 0 for the integer ones unless given.  Without a typecode, values are
+    stored in a list, and interned if intern is set, which is worthwhile for fields such as workflow_state that
+    repeat a small set of strings.
+
+    :param str name: Name of the column, and the key of the field in each item unless path is given
+    :param str typecode: (optional) Type code of the array the values are stored in, e.g. 'q' for ids or 'd' for
+        scores
+    :param tuple path: (optional) Keys of the field in nested objects of each item, e.g. ('grades', 'current_score')
+    :param bool intern: (optional) Intern the string values of a column without a typecode
+    :param missing: (optional) Value stored for a missing or null field in a column with a typecode
+    """
+
+    def __init__(self, name, typecode=None, path=None, intern=False, missing=None):
+        if typecode is None and missing is not None:
+            raise AttributeError('missing only applies to a column with a typecode')
+        if typecode is not None and intern:
+            raise AttributeError('intern only applies to a column without a typecode')
+        self.name = name
+        self.typecode = typecode
+        self.path = tuple(path) if path is not None else (name,)
+        self.intern = intern
+        if missing is None and typecode is not None:
+            missing = float('nan') if typecode in 'fd' else 0
+        self.missing = missing
+        self.values = array.array(typecode) if typecode is not None else []
+
+    def get(self, item):
+        """
+        Return the value of the field in an item, converted as it is stored in the column.
+        """
+        value = item
+        for key in self.path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            return self.missing
+        if self.intern and isinstance(value, str):
+            return sys.intern(value)
+        return value
+
+    def convert(self, items):
+        """
+        Return the values of the field in each of items, in a buffer of the column's type, without adding them to
+        the column.
+
+        :raises TypeError: If a value does not fit the typecode of the column
+        :raises OverflowError: If an integer value is out of the range of the typecode of the column
+        """
+        values = array.array(self.typecode) if self.typecode is not None else []
+        values.extend(self.get(item) for item in items)
+        return values
+
+    def extend(self, items):
+        """
+        Append the values of the field in each of items to the column.
+        """
+        self.values.extend(self.convert(items))
+
+
+class ColumnarCollector(object):
+
+    """
+    Appends the items of pages of results to a set of columns, which are accessed by name once collected,
+    e.g. ``collector['score']``.
+
+    :param columns: The columns to collect
+    :type columns: list of :class:`Column`
+    """
+
+    def __init__(self, columns):
+        self.columns = {}
+        for column in columns:
+            if column.name in self.columns:
+                raise AttributeError('Duplicate column name: %s' % column.name)
+            self.columns[column.name] = column
+        self.count = 0
+
+    def append_page(self, data):
+        """
+        Append the items of the json data of a page to every column.  The page is added to all columns or, if one of
+        its values does not fit its column, to none of them.
+
+        :param list data: The items of a page of results
+        """
+        page_values = [column.convert(data) for column in self.columns.values()]
+        for column, values in zip(self.columns.values(), page_values):
+            column.values.extend(values)
+        self.count += len(data)
+
+    def __getitem__(self, name):
+        return self.columns[name].values
+
+    def __len__(self):
+        return self.count
+
+
+def collect_columns(request_context, function, *args, columns, **kwargs):
+    """
+    Make a function request with args and kwargs and append the items of each page of results, as retrieved by
+    :py:func:`canvas_sdk.utils.get_next`, to columns as the page arrives, so only one page of items is held as json
+    data at a time.  Exceptions raised while paging are bubbled back to the caller.
+
+        :param RequestContext request_context: The context required to make an API call
+        :param function function: The API list function to call
+        :param columns: The columns to collect
+        :type columns: list of :class:`Column`
+        :return: The collector holding the columns, with one value per item in each
+        :rtype: :class:`ColumnarCollector`
+    """
+    collector = ColumnarCollector(columns)
+    response = function(request_context, *args, **kwargs)
+    collector.append_page(decode_json(request_context, response))
+    for next_response in utils.get_next(request_context, response):
+        collector.append_page(decode_json(request_context, next_response))
+    return collector
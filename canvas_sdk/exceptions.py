@@ -33,3 +33,21 @@ class CanvasAPIError(SDKException):
             return '%s: %s' % (self.status_code, self.error_msg)
         else:
             return '%s' % self.status_code
+
+
+class PartialResultError(SDKException):
+
+    """
+    Raised by the paginated helpers in :py:mod:`canvas_sdk.utils` when asked to preserve partial results and
+    paging fails after the first page.  data holds the json data of every page retrieved before the failure,
+    next_url the url of the page that could not be retrieved, so that the rest of the results can be fetched on
+    their own (e.g. with :py:func:`canvas_sdk.client.get` and get_next), and error the exception that stopped paging.
+    """
+
+    def __init__(self, data, next_url, error):
+        self.data = data
+        self.next_url = next_url
+        self.error = error
+
+    def __str__(self):
+        return 'Paging stopped at %s after %s items: %s' % (self.next_url, len(self.data), self.error)
@@ -0,0 +1,147 @@
+import sys
+
+"""
+Compact record types for the highest volume list results.  Items of list endpoints come back as
+dicts holding every attribute Canvas returns; a record keeps only the commonly used fields in
+__slots__, which takes a fraction of the memory when millions of items are held at once.  A record
+class can be passed as the projection of the paginated helpers in :py:mod:`canvas_sdk.utils`, e.g.
+``utils.iter_all(request_ctx, enrollments.list_enrollments_courses, course_id, projection=Enrollment)``,
+so that each item is converted as its page arrives.
+"""
+
+
+class Record(object):
+
+    """
+    Base class of the record types.  Subclasses list their fields in __slots__.  Each field is read from the key of
+    the same name in a json item, unless nested_fields maps it to a path of keys into nested objects (e.g. the
+    links of a page view); string values of the fields in interned_fields, which hold a small set of values such as
+    workflow states, are interned so that all records share one copy of each.  Missing fields are None.
+    """
+
+    __slots__ = ()
+    nested_fields = {}
+    interned_fields = ()
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_json(cls, item):
+        """
+        Build a record from an item of the json data returned by Canvas.
+
+        :param dict item: An item of the results of a list endpoint
+        """
+        record = cls.__new__(cls)
+        for field in cls.__slots__:
+            path = cls.nested_fields.get(field)
+            if path is None:
+                value = item.get(field)
+            else:
+                value = item
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+            if field in cls.interned_fields and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, field, value)
+        return record
+
+    def to_dict(self):
+        """
+        Return the fields of the record as a dict.
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join('%s=%r' % (field, getattr(self, field)) for field in self.__slots__))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for field in self.__slots__:
+            setattr(self, field, state.get(field))
+
+
+class User(Record):
+
+    """
+    A user, as returned by e.g. list_users_in_account or list_users_in_course_users
+    """
+
+    __slots__ = ('id', 'name', 'sortable_name', 'short_name', 'sis_user_id', 'integration_id', 'login_id', 'email',
+                 'created_at')
+
+
+class Enrollment(Record):
+
+    """
+    An enrollment, as returned by e.g. list_enrollments_courses; the scores are read from its grades
+    """
+
+    __slots__ = ('id', 'user_id', 'course_id', 'course_section_id', 'type', 'role', 'role_id', 'enrollment_state',
+                 'created_at', 'updated_at', 'last_activity_at', 'total_activity_time', 'sis_user_id',
+                 'sis_course_id', 'sis_section_id', 'current_score', 'final_score')
+    nested_fields = {
+        'current_score': ('grades', 'current_score'),
+        'final_score': ('grades', 'final_score'),
+    }
+    interned_fields = ('type', 'role', 'enrollment_state')
+
+
+class Submission(Record):
+
+    """
+    A submission, as returned by e.g. list_assignment_submissions_courses or list_submissions_for_multiple_assignments
+    """
+
+    __slots__ = ('id', 'assignment_id', 'user_id', 'grade', 'score', 'attempt', 'submitted_at', 'graded_at',
+                 'grader_id', 'workflow_state', 'submission_type', 'late', 'missing', 'excused', 'seconds_late')
+    interned_fields = ('workflow_state', 'submission_type')
+
+
+class PageView(Record):
+
+    """
+    A page view, as returned by list_user_page_views; the ids of the objects it links to are read from its links
+    """
+
+    __slots__ = ('id', 'url', 'context_type', 'asset_type', 'controller', 'action', 'interaction_seconds',
+                 'created_at', 'participated', 'http_method', 'remote_ip', 'user_agent', 'user_id', 'context_id',
+                 'asset_id', 'real_user_id', 'account_id')
+    nested_fields = {
+        'user_id': ('links', 'user'),
+        'context_id': ('links', 'context'),
+        'asset_id': ('links', 'asset'),
+        'real_user_id': ('links', 'real_user'),
+        'account_id': ('links', 'account'),
+    }
+    interned_fields = ('context_type', 'asset_type', 'controller', 'action', 'http_method')
+
+
+class GradeChangeEvent(Record):
+
+    """
+    A grade change event, as returned by the grade change log queries (e.g. query_by_course); the ids of the objects
+    it links to are read from its links
+    """
+
+    __slots__ = ('id', 'created_at', 'event_type', 'grade_before', 'grade_after', 'excused_before', 'excused_after',
+                 'graded_anonymously', 'version_number', 'request_id', 'assignment_id', 'course_id', 'student_id',
+                 'grader_id', 'page_view_id')
+    nested_fields = {
+        'assignment_id': ('links', 'assignment'),
+        'course_id': ('links', 'course'),
+        'student_id': ('links', 'student'),
+        'grader_id': ('links', 'grader'),
+        'page_view_id': ('links', 'page_view'),
+    }
+    interned_fields = ('event_type',)
@@ -1,10 +1,28 @@
+import inspect
+import queue
+import threading
+
+import requests
+
 from canvas_sdk import client
-from collections import defaultdict
+from canvas_sdk.client.json_decoders import decode_json
+from canvas_sdk.client.streaming import iter_response_items
+from canvas_sdk.exceptions import PartialResultError, SDKException
+from canvas_sdk.records import Record
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 """
 The util module contains helper methods for the SDK
 """
 
+BatchResult = namedtuple('BatchResult', ['args', 'response', 'error'])
+BatchResult.__doc__ = """
+Outcome of one call made by :py:func:`call_batch`: the positional args the function was called with,
+and either the response it returned (error is None) or the exception it raised (response is None).
+"""
+
 
 def validate_attr_is_acceptable(value, acceptable_values=[], allow_none=True):
     """
@@ -35,42 +53,310 @@ def validate_any(param_choices, *args, **kwargs):
             "%s" % (param_choices,))
 
 
-def get_next(request_context, response):
+def get_next(request_context, response, **request_kwargs):
     """
     Generator function that will iterate over a given response's "next" header links.
 
         :param :class:RequestContext request_context: The context required to make a "get" request
+        :param request_kwargs: (optional) Optional request params passed to client.get for each page,
+            e.g. stream=True
         :return: next response object retrieved by client
         :rtype: iterator
     """
     while 'next' in response.links:
-        response = client.get(request_context, response.links["next"]["url"])
+        response = client.get(request_context, response.links["next"]["url"], **request_kwargs)
         yield response
 
 
-def get_all_list_data(request_context, function, *args, **kwargs):
+def get_page_number(url):
+    """
+    Return the page number in the "page" query parameter of a pagination link, or None if the link has no numeric
+    page (e.g. it uses an opaque bookmark).
+    """
+    page = dict(parse_qsl(urlparse(url).query)).get('page')
+    return int(page) if page and page.isdigit() else None
+
+
+def get_remaining_page_urls(response):
+    """
+    Return the urls of the pages after a response, from its "next" page up to and including its "last" page, or
+    None if they can't be computed because the response's links lack a "last" page or don't use numbered pages.
+
+        :param response: A page of results
+        :type response: :class:`requests.Response`
+        :rtype: list of str or None
+    """
+    links = response.links
+    if 'next' not in links or 'last' not in links:
+        return None
+    next_url = links['next']['url']
+    next_page = get_page_number(next_url)
+    last_page = get_page_number(links['last']['url'])
+    if next_page is None or last_page is None:
+        return None
+    parsed = urlparse(next_url)
+    query = parse_qsl(parsed.query, keep_blank_values=True)
+    return [parsed._replace(query=urlencode([(key, page if key == 'page' else value) for key, value in query])).geturl()
+            for page in range(next_page, last_page + 1)]
+
+
+def get_next_parallel(request_context, response, max_workers=None):
+    """
+    Generator function equivalent to get_next that, when the response's links expose a numbered "last" page,
+    requests all the remaining pages up front with up to max_workers concurrent requests (see :py:func:`call_batch`
+    for the default) and yields them in page order.  For bookmark style links, which can only be followed one at a
+    time, it falls back to get_next.  An exception raised fetching any page is raised once the pages before it have
+    been yielded.
+
+        :param RequestContext request_context: The context required to make a "get" request
+        :param int max_workers: (optional) Number of pages to fetch concurrently
+        :return: next response object retrieved by client
+        :rtype: iterator
+    """
+    page_urls = get_remaining_page_urls(response)
+    if page_urls is None:
+        yield from get_next(request_context, response)
+        return
+    for result in call_batch(request_context, client.get, page_urls, max_workers=max_workers):
+        if result.error is not None:
+            raise result.error
+        yield result.response
+
+
+def get_next_prefetch(request_context, response, prefetch=1):
+    """
+    Generator function equivalent to get_next that follows the "next" links on a background thread, keeping up to
+    prefetch pages requested ahead of the one the caller is processing, so that waiting on the network overlaps with
+    the caller's work.  Pages are yielded in order.  An exception raised fetching a page is raised once the pages
+    before it have been yielded.
+
+        :param RequestContext request_context: The context required to make a "get" request
+        :param int prefetch: (optional) Number of pages to fetch ahead
+        :return: next response object retrieved by client
+        :rtype: iterator
+    """
+    if prefetch < 1:
+        raise AttributeError("prefetch must be at least 1.")
+    ready = queue.Queue()
+    # One slot per page that may be fetched before the caller has taken it
+    slots = threading.Semaphore(prefetch)
+    stopped = threading.Event()
+
+    def fetch():
+        try:
+            pages = get_next(request_context, response)
+            while True:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                next_response = next(pages, None)
+                ready.put(next_response)  # None marks the last page
+                if next_response is None:
+                    return
+        except Exception as error:
+            ready.put(error)
+
+    threading.Thread(target=fetch, name='canvas-sdk-prefetch', daemon=True).start()
+    try:
+        while True:
+            next_response = ready.get()
+            if next_response is None:
+                return
+            if isinstance(next_response, Exception):
+                raise next_response
+            slots.release()
+            yield next_response
+    finally:
+        # Let the background thread finish if the caller stopped early
+        stopped.set()
+        slots.release()
+
+
+def build_projection(projection):
+    """
+    Return the function that applies a projection spec, as accepted by the paginated helpers, to an item of results:
+    for a list (or tuple) of keys, a function that keeps only those keys of an item (leaving out any the item lacks);
+    for a record class (see :py:mod:`canvas_sdk.records`), its from_json, so that each item is converted to a
+    compact record; a callable is returned as is, and None, meaning items are kept whole, as None.
+
+        :param projection: The keys to keep, a record class, or a function transforming an item
+        :type projection: list of str, Record subclass, callable or None
+        :rtype: callable or None
+    """
+    if isinstance(projection, type) and issubclass(projection, Record):
+        return projection.from_json
+    if projection is None or callable(projection):
+        return projection
+    keys = tuple(projection)
+    return lambda item: {key: item[key] for key in keys if key in item}
+
+
+def project_page(data, projection):
+    """
+    Apply a function returned by :py:func:`build_projection` to each item of the json data of a page, or to the data
+    itself if it is not a list, so that the unprojected items can be discarded before the next page is fetched.
+
+        :param data: The json data of a page
+        :param projection: The function applied to each item, or None to return data unchanged
+        :type projection: callable or None
+    """
+    if projection is None:
+        return data
+    if isinstance(data, list):
+        return [projection(item) for item in data]
+    return projection(data)
+
+
+def get_all_list_data(request_context, function, *args, partial=False, projection=None, **kwargs):
     """
     Make a function request with args and kwargs and iterate over the "next" responses until exhausted.
     Return initial response json data or all json data as a single list.  Responses that have a series of
     next responses (as retrieved by get_next generator) are expected to have data returned as a list.
     If an exception is raised during the initial function call or in the process of paging over results,
-    that exception will be bubbled back to the caller and any intermediary results will be lost.  Worst case
-    complexity O(n).
+    that exception will be bubbled back to the caller and any intermediary results will be lost, unless partial
+    is set: then a Canvas or network error raised while paging is re-raised as a
+    :class:`PartialResultError <canvas_sdk.exceptions.PartialResultError>` that holds the data retrieved so far
+    and the url of the page that failed.  Worst case complexity O(n).  See :py:func:`iter_all` to process the
+    items one page at a time instead of holding them all in memory, or pass a projection to keep only part of each
+    item: a list of the keys to keep, or a function applied to each item (see :py:func:`build_projection`).  The
+    projection is applied to each page as it arrives, so the full items of a page are discarded before the next
+    page is fetched.
 
 
         :param RequestContext request_context: The context required to make an API call
         :param function function: The API function to call
+        :param bool partial: (optional) Preserve the data retrieved before a failure while paging
+        :param projection: (optional) The keys to keep of each item, or a function transforming each item
+        :type projection: list of str, Record subclass or callable
         :return: A list of all json data retrieved while iterating over response links, or the initial json
             function response if there are no paged results
         :rtype: list of json data or json
     """
+    projection = build_projection(projection)
     response = function(request_context, *args, **kwargs)
-    data = response.json()
-    for next_response in get_next(request_context, response):
-        data.extend(next_response.json())
+    data = project_page(decode_json(request_context, response), projection)
+    try:
+        for next_response in get_next(request_context, response):
+            data.extend(project_page(decode_json(request_context, next_response), projection))
+            response = next_response
+    except (SDKException, requests.exceptions.RequestException) as error:
+        if not partial:
+            raise
+        raise PartialResultError(data, response.links['next']['url'], error) from error
     return data
 
 
+def get_all_list_data_resumable(request_context, function, *args, checkpoint_store, checkpoint_key, projection=None,
+                                **kwargs):
+    """
+    Equivalent of get_all_list_data that checkpoints its progress, for long running exports.  After each page is
+    retrieved, its data and the url of the next page are appended to the checkpoint saved under checkpoint_key in
+    checkpoint_store (see :py:mod:`canvas_sdk.checkpoints`).  If an exception is raised while paging, the checkpoint
+    is kept, and a later call with the same checkpoint_key resumes from the page that failed instead of repeating
+    the function request; the checkpoint is deleted once the last page has been retrieved.  The caller is
+    responsible for using a checkpoint_key that identifies the function, args, kwargs and projection, which is
+    applied to each page (as by get_all_list_data) before it is checkpointed, so it must leave items that the
+    checkpoint store can serialize as json (a list of keys, rather than a record class).
+
+        :param RequestContext request_context: The context required to make an API call
+        :param function function: The API function to call
+        :param checkpoint_store: Where checkpoints are saved, e.g. a
+            :class:`FileCheckpointStore <canvas_sdk.checkpoints.FileCheckpointStore>`
+        :param str checkpoint_key: The key the checkpoint of this export is saved under
+        :param projection: (optional) The keys to keep of each item, or a function transforming each item
+        :type projection: list of str or callable
+        :return: A list of all json data retrieved while iterating over response links, or the initial json
+            function response if there are no paged results
+        :rtype: list of json data or json
+    """
+    projection = build_projection(projection)
+    checkpoint = checkpoint_store.load(checkpoint_key)
+    if checkpoint is None:
+        response = function(request_context, *args, **kwargs)
+        if 'next' not in response.links:
+            return project_page(decode_json(request_context, response), projection)
+        data = []
+    else:
+        next_url, data = checkpoint
+        response = client.get(request_context, next_url)
+    while 'next' in response.links:
+        page_data = project_page(decode_json(request_context, response), projection)
+        data.extend(page_data)
+        checkpoint_store.append(checkpoint_key, response.links['next']['url'], page_data)
+        response = client.get(request_context, response.links['next']['url'])
+    data.extend(project_page(decode_json(request_context, response), projection))
+    checkpoint_store.delete(checkpoint_key)
+    return data
+
+
+def iter_all(request_context, function, *args, limit=None, max_workers=None, prefetch=None, stream=False,
+             projection=None, **kwargs):
+    """
+    Make a function request with args and kwargs and generate the items of each page of results as it arrives,
+    following the "next" responses (as retrieved by the get_next generator) until they are exhausted or limit items
+    have been generated.  Only one page is held in memory at a time, and no further pages are requested once limit
+    is reached.  A page whose json data is not a list is generated as a single item.
+
+    If max_workers is given, numbered pages are fetched concurrently by the get_next_parallel generator instead;
+    items are still generated in order, but up to twice max_workers pages may be buffered (and requested past
+    limit).  Otherwise, if prefetch is given, the pages are followed by the get_next_prefetch generator, which
+    requests up to prefetch pages ahead while the items of the current one are being processed.
+
+    If stream is set, every page is requested with stream=True and its items are parsed off the socket one at a
+    time (see :py:mod:`canvas_sdk.client.streaming`), so that only one item, rather than one page, is held in
+    memory; the pages must hold json arrays and are followed one at a time, so stream can't be combined with
+    max_workers or prefetch.
+
+    If a projection is given, each item is generated as projected (see :py:func:`build_projection`).
+
+        :param RequestContext request_context: The context required to make an API call
+        :param function function: The API function to call
+        :param int limit: (optional) Maximum number of items to generate
+        :param int max_workers: (optional) Number of pages to fetch concurrently
+        :param int prefetch: (optional) Number of pages to fetch ahead in the background
+        :param bool stream: (optional) Parse the items of each page as they arrive
+        :param projection: (optional) The keys to keep of each item, or a function transforming each item
+        :type projection: list of str, Record subclass or callable
+        :return: The json data of each item retrieved while iterating over response links
+        :rtype: iterator of json data
+    """
+    if stream and (max_workers is not None or prefetch is not None):
+        raise AttributeError("stream can't be combined with max_workers or prefetch.")
+    if limit is not None and limit <= 0:
+        return
+    projection = build_projection(projection)
+    count = 0
+    if stream:
+        kwargs['stream'] = True
+    response = function(request_context, *args, **kwargs)
+    if stream:
+        pages = get_next(request_context, response, stream=True)
+    elif max_workers is not None:
+        pages = get_next_parallel(request_context, response, max_workers=max_workers)
+    elif prefetch is not None:
+        pages = get_next_prefetch(request_context, response, prefetch=prefetch)
+    else:
+        pages = get_next(request_context, response)
+    try:
+        while response is not None:
+            if stream:
+                items = iter_response_items(response)
+            else:
+                data = decode_json(request_context, response)
+                items = data if isinstance(data, list) else [data]
+            for item in items:
+                yield item if projection is None else projection(item)
+                count += 1
+                if count == limit:
+                    return
+            response = next(pages, None)
+    finally:
+        if stream and response is not None:
+            response.close()  # Release the connection of a page that wasn't read to the end
+        # Stop any pages still being fetched in the background
+        pages.close()
+
+
 def masquerade(request_context, function, as_user_id, *args, **kwargs):
     """
     Make a function request on behalf of another user.  In order to masquerade, the calling user must
@@ -83,19 +369,98 @@ def masquerade(request_context, function, as_user_id, *args, **kwargs):
         :return: Response from function call
     """
     function_kwargs = defaultdict(dict, **kwargs)
-    # Merge or create as_user_id into params kwarg - use defaultdict to reduce conditional logic
-    function_kwargs['params'].update(as_user_id=as_user_id)
+    # Merge or create as_user_id into a copy of the params kwarg, so that a params dictionary shared by
+    # several threads is never modified - use defaultdict to reduce conditional logic
+    function_kwargs['params'] = dict(function_kwargs['params'], as_user_id=as_user_id)
     return function(request_context, *args, **function_kwargs)
 
 
 def get_count(request_context, function, *args, **kwargs):
     """
-    Make a function request with args and kwargs and return the total result count.  Worst case complexity
-    is O(n).
+    Make a function request with args and kwargs and return the total result count.  If the function takes a
+    per_page parameter, a page of a single item is requested and the count is read from the page number of its
+    "last" link, so only one request is made.  Otherwise, or if Canvas doesn't include a numbered "last" link, the
+    pages are walked and their items counted without being kept, which has a worst case complexity of O(n).
 
         :param RequestContext request_context: The context required to make an API call
         :param function function: The API function to call
         :return: Total result count
         :rtype: int
     """
-    return len(get_all_list_data(request_context, function, *args, **kwargs))
+    if 'per_page' in inspect.signature(function).parameters:
+        response = function(request_context, *args, **dict(kwargs, per_page=1))
+        if 'next' not in response.links:
+            return len(decode_json(request_context, response))
+        if 'last' in response.links:
+            last_page = get_page_number(response.links['last']['url'])
+            if last_page is not None:
+                return last_page
+    response = function(request_context, *args, **kwargs)
+    count = len(decode_json(request_context, response))
+    for next_response in get_next(request_context, response):
+        count += len(decode_json(request_context, next_response))
+    return count
+
+
+def call_batch(request_context, function, arg_tuples, max_workers=None, ordered=True, **kwargs):
+    """
+    Call function once for each tuple of positional args in arg_tuples (a single value may be given instead of a
+    1-tuple), running up to max_workers calls concurrently on a thread pool, and generate a :py:class:`BatchResult`
+    for each call.  Every call receives request_context and kwargs.  A call that raises does not abort the batch;
+    its exception is returned in the error field of its result instead.  arg_tuples is consumed lazily, so it may be
+    a generator over a large number of items.
+
+    By default max_workers is the max_concurrency of the context's throttle, or its pool_maxsize if it has no
+    throttle, so that the batch neither queues more requests than the rate limiter lets through nor opens more
+    connections than the pool keeps.  Use a context created with per_thread_sessions, and the sync transport: calls
+    made with an :class:`AsyncRequestContext` return coroutines, which should be run with asyncio.gather instead.
+
+        :param RequestContext request_context: The context required to make an API call
+        :param function function: The API function to call
+        :param arg_tuples: The positional args of each call, after request_context
+        :type arg_tuples: iterable of tuples
+        :param int max_workers: (optional) Number of calls to run concurrently
+        :param bool ordered: (optional) If ``True`` (the default), results are generated in the order of arg_tuples;
+            otherwise as soon as each call completes
+        :return: One result per item of arg_tuples
+        :rtype: iterator of :py:class:`BatchResult`
+    """
+    if max_workers is None:
+        throttle = request_context.throttle
+        max_workers = throttle.max_concurrency if throttle else request_context.pool_maxsize
+    if max_workers < 1:
+        raise AttributeError("max_workers must be at least 1.")
+
+    def run(args):
+        try:
+            return BatchResult(args, function(request_context, *args, **kwargs), None)
+        except Exception as error:
+            return BatchResult(args, None, error)
+
+    # Keep a bounded number of calls queued ahead of the workers rather than submitting every item up front
+    window = max_workers * 2
+    futures = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for args in arg_tuples:
+            if type(args) not in (list, tuple):
+                args = (args,)
+            futures.append(executor.submit(run, tuple(args)))
+            while len(futures) >= window:
+                yield _pop_batch_result(futures, ordered)
+        while futures:
+            yield _pop_batch_result(futures, ordered)
+    finally:
+        # Don't start the remaining calls if the caller stopped consuming results early
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _pop_batch_result(futures, ordered):
+    if ordered:
+        return futures.popleft().result()
+    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+    future = done.pop()
+    futures.remove(future)
+    return future.result()
@@ -0,0 +1,159 @@
+import argparse
+import json
+import random
+import timeit
+
+import requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+Compare the json decoders available for the json_decoder option of RequestContext on pages shaped
+like the ones Canvas returns for enrollments, submissions and users.  Run from the repository root:
+
+    python scripts/benchmark_json_decoders.py --per-page 100 --repeat 200
+"""
+
+TIMESTAMP = '2024-09-03T14:%02d:%02dZ'
+
+
+def build_user(user_id):
+    return {
+        'id': user_id,
+        'name': 'Student %d' % user_id,
+        'created_at': TIMESTAMP % (user_id % 60, user_id % 60),
+        'sortable_name': '%d, Student' % user_id,
+        'short_name': 'Student %d' % user_id,
+        'sis_user_id': 'SIS%08d' % user_id,
+        'integration_id': None,
+        'login_id': 'student%d@example.edu' % user_id,
+        'avatar_url': 'https://canvas.example.edu/images/messages/avatar-50.png',
+        'email': 'student%d@example.edu' % user_id,
+        'locale': None,
+        'effective_locale': 'en',
+    }
+
+
+def build_enrollment(index):
+    user_id = 100000 + index
+    return {
+        'id': 5000000 + index,
+        'user_id': user_id,
+        'course_id': 12345,
+        'type': 'StudentEnrollment',
+        'created_at': TIMESTAMP % (index % 60, index % 60),
+        'updated_at': TIMESTAMP % (index % 60, index % 60),
+        'associated_user_id': None,
+        'start_at': None,
+        'end_at': None,
+        'course_section_id': 23456,
+        'root_account_id': 1,
+        'limit_privileges_to_course_section': False,
+        'enrollment_state': 'active',
+        'role': 'StudentEnrollment',
+        'role_id': 3,
+        'last_activity_at': TIMESTAMP % (index % 60, (index * 7) % 60),
+        'total_activity_time': random.randint(0, 500000),
+        'sis_import_id': 9876,
+        'grades': {
+            'html_url': 'https://canvas.example.edu/courses/12345/grades/%d' % user_id,
+            'current_score': round(random.uniform(50, 100), 2),
+            'current_grade': None,
+            'final_score': round(random.uniform(50, 100), 2),
+            'final_grade': None,
+        },
+        'sis_account_id': 'ACCT-1',
+        'sis_course_id': 'COURSE-2024-FA',
+        'sis_section_id': 'SECTION-001',
+        'sis_user_id': 'SIS%08d' % user_id,
+        'html_url': 'https://canvas.example.edu/courses/12345/users/%d' % user_id,
+        'user': build_user(user_id),
+    }
+
+
+def build_submission(index):
+    return {
+        'id': 70000000 + index,
+        'assignment_id': 345678,
+        'user_id': 100000 + index,
+        'body': None,
+        'url': None,
+        'grade': '%d' % random.randint(0, 100),
+        'score': float(random.randint(0, 100)),
+        'submitted_at': TIMESTAMP % (index % 60, index % 60),
+        'graded_at': TIMESTAMP % ((index + 1) % 60, index % 60),
+        'grader_id': 42,
+        'attempt': 1,
+        'cached_due_date': '2024-09-10T05:59:59Z',
+        'excused': False,
+        'late_policy_status': None,
+        'points_deducted': None,
+        'grading_period_id': None,
+        'late': False,
+        'missing': False,
+        'seconds_late': 0,
+        'workflow_state': 'graded',
+        'submission_type': 'online_text_entry',
+        'preview_url': 'https://canvas.example.edu/courses/12345/assignments/345678/submissions/%d?preview=1'
+                       % (100000 + index),
+        'submission_comments': [
+            {'id': 900000 + index, 'author_id': 42, 'author_name': 'Instructor',
+             'comment': 'Nice work on section %d, see the rubric for details.' % index,
+             'created_at': TIMESTAMP % (index % 60, 0)},
+        ],
+    }
+
+
+PAYLOADS = {
+    'enrollments': build_enrollment,
+    'submissions': build_submission,
+    'users': lambda index: build_user(100000 + index),
+}
+
+
+def build_decoders():
+    """
+    Return the decoders to compare, keyed by name; each takes the bytes of a page.
+    """
+    def response_json(content):
+        response = requests.Response()
+        response._content = content
+        response.encoding = 'utf-8'
+        return response.json()
+
+    decoders = {
+        'response.json()': response_json,
+        'json.loads': json.loads,
+    }
+    if orjson is not None:
+        decoders['orjson.loads'] = orjson.loads
+    return decoders
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark json decoders on Canvas shaped pages.')
+    parser.add_argument('--per-page', type=int, default=100, help='Items per page (default 100)')
+    parser.add_argument('--repeat', type=int, default=200, help='Pages decoded per measurement (default 200)')
+    args = parser.parse_args()
+
+    random.seed(0)
+    decoders = build_decoders()
+    if orjson is None:
+        print('orjson is not installed; pip install orjson to include it.\n')
+    print('%-12s %-16s %12s %10s' % ('payload', 'decoder', 'ms per page', 'speedup'))
+    for payload, build_item in PAYLOADS.items():
+        content = json.dumps([build_item(index) for index in range(args.per_page)]).encode('utf-8')
+        baseline = None
+        for name, decoder in decoders.items():
+            assert decoder(content) == json.loads(content)
+            seconds = min(timeit.repeat(lambda: decoder(content), number=args.repeat, repeat=3)) / args.repeat
+            baseline = baseline or seconds
+            print('%-12s %-16s %12.3f %9.1fx' % (payload, name, seconds * 1000, baseline / seconds))
+        print('%-12s %-16s %12s' % ('', '(%d KB page)' % (len(content) // 1024), ''))
+
+
+if __name__ == '__main__':
+    main()
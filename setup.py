@@ -34,6 +34,8 @@ setup(
     ],
     extras_require={
         'docs': ['sphinx>=1.2.0'],
+        'async': ['aiohttp>=3.7'],
+        'fast-json': ['orjson'],
     },
     python_requires='>=3.6',
     test_suite='tests',
@@ -0,0 +1,240 @@
+import asyncio
+import unittest
+
+from unittest import mock
+from unittest.mock import patch
+
+from canvas_sdk import client
+from canvas_sdk.client import AsyncRequestContext, async_base, base, async_request_context
+from canvas_sdk.exceptions import CanvasAPIError
+
+# None when aiohttp is not installed, in which case the tests are skipped
+aiohttp = async_request_context.aiohttp
+if aiohttp is not None:
+    import aiohttp.web
+
+
+# IsolatedAsyncioTestCase (and mock.AsyncMock) are only available from Python 3.8
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase', unittest.TestCase)
+
+
+@unittest.skipIf(async_request_context.aiohttp is None, "aiohttp is not installed")
+@unittest.skipIf(AsyncTestCase is unittest.TestCase, "async tests require Python 3.8 or later")
+class TestAsyncBase(AsyncTestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.base_api_url = "https://path/to/canvas/api"
+        self.url = self.base_api_url + "/fake/path/to/method"
+        self.req_ctx = AsyncRequestContext('my-auth-token', self.base_api_url)
+        self.session = mock.MagicMock(name='aiohttp-session', closed=False)
+        self.req_ctx.session = self.session
+        self.set_response()
+
+    def set_response(self, status=200, body=b'{"foo": "bar"}', headers=None):
+        """
+        Make the mocked aiohttp session return a response with the given status, body and headers
+        """
+        aiohttp_response = mock.MagicMock(name='aiohttp-response')
+        aiohttp_response.status = status
+        aiohttp_response.reason = 'reason'
+        aiohttp_response.url = self.url
+        response_headers = headers or {'Content-Type': 'application/json'}
+        aiohttp_response.headers.keys.return_value = list(response_headers)
+        aiohttp_response.headers.getall.side_effect = lambda key: [response_headers[key]]
+        aiohttp_response.read = mock.AsyncMock(return_value=body)
+        self.session.request.return_value.__aenter__ = mock.AsyncMock(return_value=aiohttp_response)
+        self.session.request.return_value.__aexit__ = mock.AsyncMock(return_value=False)
+        return aiohttp_response
+
+    def test_base_call_returns_awaitable_for_async_context(self):
+        """
+        Test that client.base.call hands back a coroutine when given an AsyncRequestContext
+        """
+        with patch('canvas_sdk.client.base.async_base.call', new=mock.Mock()) as async_call:
+            result = client.get(self.req_ctx, self.url)
+        self.assertEqual(result, async_call.return_value,
+                         "Call with an async context should return the result of async_base.call")
+
+    async def test_call_returns_requests_response(self):
+        """
+        Test that the aiohttp response is converted into a requests.Response
+        """
+        result = await base.call("GET", self.url, self.req_ctx)
+        self.assertEqual(200, result.status_code)
+        self.assertEqual({'foo': 'bar'}, result.json())
+        self.assertEqual('application/json', result.headers['content-type'])
+
+    async def test_call_encodes_params_and_auth_like_requests(self):
+        """
+        Test that list params are repeated, None params are dropped and the bearer token is attached
+        """
+        await async_base.get(self.req_ctx, self.url, {'include[]': ['a', 'b'], 'skip': None})
+        args, kwargs = self.session.request.call_args
+        self.assertEqual('GET', args[0])
+        self.assertEqual(self.url + '?include%5B%5D=a&include%5B%5D=b', str(args[1]))
+        self.assertEqual('Bearer my-auth-token', kwargs['headers']['Authorization'])
+
+    async def test_call_encodes_data_as_form_body(self):
+        """
+        Test that a data payload is sent as a form encoded body
+        """
+        await async_base.post(self.req_ctx, self.url, {'enrollment[user_id]': 1})
+        self.assertEqual('enrollment%5Buser_id%5D=1', self.session.request.call_args[1]['data'])
+
+    @patch('canvas_sdk.client.base.RETRY_ERROR_CODES', (503,))
+    async def test_call_retries_retriable_status_codes(self):
+        """
+        Test that retriable errors are retried up to max_retries times before being raised
+        """
+        self.set_response(status=503, body=b'{"errors": "down"}')
+        with self.assertRaises(CanvasAPIError) as canvas_error:
+            await async_base.call("GET", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(3, self.session.request.call_count)
+        self.assertEqual(503, canvas_error.exception.status_code)
+        self.assertEqual({'errors': 'down'}, canvas_error.exception.error_json)
+
+    async def test_call_raises_canvas_api_error_on_non_retry_status(self):
+        """
+        Test that non retriable errors are raised after a single request
+        """
+        self.set_response(status=404, body=b'Not Found')
+        with self.assertRaises(CanvasAPIError) as canvas_error:
+            await async_base.call("GET", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(1, self.session.request.call_count)
+        self.assertEqual('Not Found', canvas_error.exception.error_msg)
+
+    async def test_call_retries_idempotent_request_after_network_error(self):
+        """
+        Test that a GET whose connection drops is retried up to max_retries times before the error is raised
+        """
+        self.session.request.side_effect = aiohttp.ServerDisconnectedError()
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await async_base.call("GET", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(3, self.session.request.call_count)
+
+    async def test_call_does_not_retry_post_after_network_error_by_default(self):
+        """
+        Test that a POST that fails after reaching Canvas is not retried unless marked as idempotent
+        """
+        self.session.request.side_effect = aiohttp.ServerDisconnectedError()
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await async_base.call("POST", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(1, self.session.request.call_count)
+
+    async def test_call_retries_post_after_refused_connection(self):
+        """
+        Test that a POST that never reached Canvas is retried even if not idempotent, as by the sync transport
+        """
+        refused = aiohttp.ClientConnectorError(mock.Mock(name='connection-key'), ConnectionRefusedError())
+        self.session.request.side_effect = refused
+        with self.assertRaises(aiohttp.ClientConnectorError):
+            await async_base.call("POST", self.url, self.req_ctx, max_retries=1)
+        self.assertEqual(2, self.session.request.call_count)
+        self.assertTrue(async_base.is_connect_error(refused))
+        self.assertFalse(async_base.is_connect_error(aiohttp.ServerDisconnectedError()))
+
+    @patch('canvas_sdk.client.base.RETRY_ERROR_CODES', (503,))
+    async def test_call_sleeps_for_backoff_delay_between_retries(self):
+        """
+        Test that the delay computed by the context backoff policy is awaited before each retry
+        """
+        self.set_response(status=503, body=b'{"errors": "down"}')
+        self.req_ctx.backoff = mock.Mock(name='backoff')
+        self.req_ctx.backoff.get_delay.side_effect = [1.5, 3.0]
+        with patch('canvas_sdk.client.async_base.asyncio.sleep', new_callable=mock.AsyncMock) as mock_sleep:
+            with self.assertRaises(CanvasAPIError):
+                await async_base.call("GET", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual([mock.call(1.5), mock.call(3.0)], mock_sleep.await_args_list)
+
+    async def test_call_acquires_releases_and_updates_context_throttle(self):
+        """
+        Test that a throttle on the context is awaited before the request, released after it and updated
+        with the response
+        """
+        throttle = mock.Mock(name='throttle')
+        throttle.async_acquire = mock.AsyncMock()
+        self.req_ctx.throttle = throttle
+        response = await async_base.call("GET", self.url, self.req_ctx)
+        throttle.async_acquire.assert_awaited_once_with()
+        throttle.release.assert_called_once_with()
+        throttle.update.assert_called_once_with(response)
+
+    async def test_call_releases_context_throttle_when_request_fails(self):
+        """
+        Test that the throttle slot is given back when the request raises
+        """
+        throttle = mock.Mock(name='throttle')
+        throttle.async_acquire = mock.AsyncMock()
+        self.req_ctx.throttle = throttle
+        self.session.request.side_effect = aiohttp.ServerDisconnectedError()
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await async_base.call("GET", self.url, self.req_ctx)
+        throttle.release.assert_called_once_with()
+
+    async def test_session_connector_is_bounded_by_pool_maxsize(self):
+        """
+        Test that the aiohttp connector never opens more than pool_maxsize connections to a host
+        """
+        req_ctx = AsyncRequestContext('my-auth-token', self.base_api_url, pool_maxsize=4)
+        async with req_ctx:
+            self.assertEqual(4, req_ctx.session.connector.limit_per_host)
+            self.assertEqual(40, req_ctx.session.connector.limit)
+
+    async def test_pool_stats_counts_new_and_reused_connections(self):
+        """
+        Test that pool_stats counts the requests sent by the session and the connections opened for them
+        """
+        async def handle(request):
+            return aiohttp.web.json_response([])
+
+        app = aiohttp.web.Application()
+        app.router.add_get('/api/v1/courses', handle)
+        runner = aiohttp.web.AppRunner(app)
+        await runner.setup()
+        site = aiohttp.web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base_api_url = 'http://127.0.0.1:%d/api' % port
+        try:
+            async with AsyncRequestContext('my-auth-token', base_api_url) as req_ctx:
+                self.assertEqual({'requests': 0, 'new_connections': 0, 'reused_connections': 0},
+                                 req_ctx.pool_stats())
+                for _ in range(3):
+                    await async_base.get(req_ctx, base_api_url + '/v1/courses')
+                self.assertEqual({'requests': 3, 'new_connections': 1, 'reused_connections': 2},
+                                 req_ctx.pool_stats())
+        finally:
+            await runner.cleanup()
+
+    async def test_close_closes_session(self):
+        """
+        Test that closing the context closes the aiohttp session
+        """
+        self.session.close = mock.AsyncMock()
+        await self.req_ctx.close()
+        self.session.close.assert_awaited_once_with()
+
+    async def test_expire_session_closes_session(self):
+        """
+        Test that expiring the session of an async context closes it, so its connections are not leaked, and that
+        the next request creates a new one
+        """
+        req_ctx = AsyncRequestContext('my-auth-token', self.base_api_url)
+        session = req_ctx.session
+        await req_ctx.expire_session()
+        self.assertTrue(session.closed)
+        self.assertIsNot(session, req_ctx.session)
+        await req_ctx.close()
+
+    async def test_call_coalesces_identical_concurrent_gets(self):
+        """
+        Test that identical GETs awaited at the same time share one request when the
+        context coalesces requests
+        """
+        self.req_ctx = AsyncRequestContext('my-auth-token', self.base_api_url, coalesce_requests=True)
+        self.req_ctx.session = self.session
+        responses = await asyncio.gather(*[async_base.call("GET", self.url, self.req_ctx) for _ in range(3)])
+        self.assertEqual(1, self.session.request.call_count)
+        self.assertIs(responses[0], responses[2])
+        self.assertEqual(2, self.req_ctx.single_flight.coalesced)
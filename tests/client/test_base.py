@@ -1,11 +1,16 @@
+import threading
+import time
 import unittest
 
 from unittest import mock
 from unittest.mock import patch
-from requests.exceptions import HTTPError
+from requests.exceptions import ConnectionError, ConnectTimeout, HTTPError, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
 
 from canvas_sdk import client
 from canvas_sdk.client import base
+from canvas_sdk.client.cache import MemoryCache
+from canvas_sdk.client.coalesce import SingleFlight
 from canvas_sdk.exceptions import (
     SDKException, CanvasAPIError, InvalidOAuthTokenError)
 
@@ -23,7 +28,8 @@ class TestBase(unittest.TestCase):
         'proxies': None,
         'verify': None,
         'cert': None,
-        'allow_redirects': True
+        'allow_redirects': True,
+        'stream': False
     }
 
     def setUp(self):
@@ -34,11 +40,22 @@ class TestBase(unittest.TestCase):
         self.req_ctx.base_api_url = self.base_api_url
         self.req_ctx.session = self.session
         self.req_ctx.max_retries = 0
+        self.req_ctx.throttle = None
+        self.req_ctx.backoff = None
+        self.req_ctx.on_retry = None
+        self.req_ctx.get_timeout.return_value = None
+        self.req_ctx.cache = None
+        self.req_ctx.cache_revalidate = False
+        self.req_ctx.single_flight = None
+        self.req_ctx.get_per_page.return_value = None
+        self.req_ctx.json_decoder = None
+        self.req_ctx.auth_token = 'my-auth-token'
         self.payload = {'foo': 'bar'}
         self.request_kwargs = {'headers': {'my': 'header'}, 'timeout': 30}
 
     def make_retry_call_with_error_code(self, http_error_code, max_retries=None,
-                                        error_json=None, response_headers=None):
+                                        error_json=None, response_headers=None,
+                                        response_text=''):
         """
         Makes a call that will raise an http error in order to potentially
         trigger the request being retried up to "max_retries" times.  Otherwise,
@@ -48,6 +65,7 @@ class TestBase(unittest.TestCase):
         self.session.request.return_value.raise_for_status.side_effect = HTTPError()
         self.session.request.return_value.status_code = http_error_code
         self.session.request.return_value.json.return_value = error_json or {}
+        self.session.request.return_value.text = response_text
         # Response headers
         self.session.request.return_value.headers = response_headers or {}
 
@@ -561,3 +579,317 @@ class TestBase(unittest.TestCase):
             error_code, max_retries=1, response_headers=resp_headers)
 
         self.assertIs(type(canvas_error), CanvasAPIError)
+
+    def test_call_retries_rate_limit_exceeded_forbidden_response(self):
+        """
+        Test that a 403 "Rate Limit Exceeded" response is retried like the codes in
+        RETRY_ERROR_CODES.
+        """
+        max_retries = 2
+        self.make_retry_call_with_error_code(
+            403, max_retries=max_retries, response_text='403 Forbidden (Rate Limit Exceeded)')
+        self.assertEqual(max_retries + 1, self.session.request.call_count,
+                         "Call should have been made 'max_retries' + 1 times")
+
+    def test_call_does_not_retry_other_forbidden_responses(self):
+        """
+        Test that a 403 response that isn't about the rate limit is raised immediately.
+        """
+        canvas_error = self.make_retry_call_with_error_code(
+            403, max_retries=2, response_text='user not authorized to perform that action')
+        self.assertEqual(1, self.session.request.call_count,
+                         "Request call should have been made only once")
+        self.assertIs(type(canvas_error), CanvasAPIError)
+
+    def test_call_acquires_releases_and_updates_context_throttle(self):
+        """
+        Test that a throttle on the context is acquired before the request, released after
+        it and updated with the response.
+        """
+        throttle = mock.Mock(name='throttle')
+        self.req_ctx.throttle = throttle
+        base.call("GET", self.url, self.req_ctx)
+        throttle.acquire.assert_called_once_with()
+        throttle.release.assert_called_once_with()
+        throttle.update.assert_called_once_with(self.session.request.return_value)
+
+    def test_call_releases_context_throttle_when_request_fails(self):
+        """
+        Test that the throttle slot is given back when the request raises.
+        """
+        throttle = mock.Mock(name='throttle')
+        self.req_ctx.throttle = throttle
+        self.session.request.side_effect = ValueError()
+        with self.assertRaises(ValueError):
+            base.call("GET", self.url, self.req_ctx)
+        throttle.release.assert_called_once_with()
+
+    @patch('canvas_sdk.client.base.time.sleep')
+    @patch('canvas_sdk.client.base.RETRY_ERROR_CODES', (503,))
+    def test_call_does_not_sleep_between_retries_without_backoff(self, mock_sleep):
+        """
+        Test that retries are sent immediately when the context has no backoff policy.
+        """
+        self.make_retry_call_with_error_code(503, max_retries=2)
+        self.assertFalse(mock_sleep.called, "No backoff policy means no sleep")
+
+    @patch('canvas_sdk.client.base.time.sleep')
+    @patch('canvas_sdk.client.base.RETRY_ERROR_CODES', (503,))
+    def test_call_sleeps_for_backoff_delay_between_retries(self, mock_sleep):
+        """
+        Test that the delay computed by the context backoff policy is slept before each retry,
+        and that the previous delay is passed along to the policy.
+        """
+        self.req_ctx.backoff = mock.Mock(name='backoff')
+        self.req_ctx.backoff.get_delay.side_effect = [1.5, 3.0]
+        self.make_retry_call_with_error_code(503, max_retries=2)
+        self.assertEqual([mock.call(1.5), mock.call(3.0)], mock_sleep.call_args_list)
+        self.assertEqual(
+            [mock.call(1, 0, self.session.request.return_value),
+             mock.call(2, 1.5, self.session.request.return_value)],
+            self.req_ctx.backoff.get_delay.call_args_list)
+
+    @patch('canvas_sdk.client.base.time.sleep')
+    @patch('canvas_sdk.client.base.RETRY_ERROR_CODES', (503,))
+    def test_call_reports_each_retry_attempt_to_on_retry(self, mock_sleep):
+        """
+        Test that every retry is recorded through the context on_retry callback.
+        """
+        on_retry = mock.Mock(name='on-retry')
+        self.req_ctx.on_retry = on_retry
+        self.make_retry_call_with_error_code(503, max_retries=2)
+        self.assertEqual(2, on_retry.call_count, "Each retry (but not the final failure) should be recorded")
+        attempt = on_retry.call_args_list[1][0][0]
+        self.assertEqual(("GET", self.url, 2, 503, 0), (
+            attempt.action, attempt.url, attempt.attempt, attempt.status_code, attempt.delay))
+        self.assertIsInstance(attempt.error, HTTPError)
+
+    def test_call_retries_idempotent_request_after_network_error(self):
+        """
+        Test that a GET that fails with a connection error is retried up to max_retries
+        times before the error is raised back to the caller.
+        """
+        self.session.request.side_effect = ConnectionError()
+        with self.assertRaises(ConnectionError):
+            base.call("GET", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(3, self.session.request.call_count,
+                         "Call should have been made 'max_retries' + 1 times")
+
+    def test_call_returns_response_after_recovering_from_network_error(self):
+        """
+        Test that a request that times out once and then succeeds returns the response.
+        """
+        response = mock.MagicMock(name='response')
+        self.session.request.side_effect = [ReadTimeout(), response]
+        result = base.call("PUT", self.url, self.req_ctx, max_retries=1)
+        self.assertEqual(response, result, "The response of the successful retry should be returned")
+
+    def test_call_does_not_retry_post_after_network_error_by_default(self):
+        """
+        Test that a POST that fails after reaching Canvas is not retried unless it is
+        explicitly marked as idempotent.
+        """
+        self.session.request.side_effect = ReadTimeout()
+        with self.assertRaises(ReadTimeout):
+            base.call("POST", self.url, self.req_ctx, max_retries=2)
+        self.assertEqual(1, self.session.request.call_count,
+                         "Request call should have been made only once")
+
+    def test_call_retries_post_after_network_error_when_idempotent(self):
+        """
+        Test that a POST explicitly marked as idempotent is retried after a network error.
+        """
+        self.session.request.side_effect = ReadTimeout()
+        with self.assertRaises(ReadTimeout):
+            base.call("POST", self.url, self.req_ctx, max_retries=2, idempotent=True)
+        self.assertEqual(3, self.session.request.call_count,
+                         "Call should have been made 'max_retries' + 1 times")
+
+    def test_call_retries_post_after_connect_timeout(self):
+        """
+        Test that a POST that never reached Canvas is retried even if not idempotent.
+        """
+        self.session.request.side_effect = ConnectTimeout()
+        with self.assertRaises(ConnectTimeout):
+            base.call("POST", self.url, self.req_ctx, max_retries=1)
+        self.assertEqual(2, self.session.request.call_count,
+                         "Call should have been made 'max_retries' + 1 times")
+
+    def test_call_retries_post_after_refused_connection(self):
+        """
+        Test that a POST whose connection was refused is retried even if not idempotent.
+        """
+        refused = NewConnectionError(None, 'Connection refused')
+        self.session.request.side_effect = ConnectionError(MaxRetryError(None, self.url, refused))
+        with self.assertRaises(ConnectionError):
+            base.call("POST", self.url, self.req_ctx, max_retries=1)
+        self.assertEqual(2, self.session.request.call_count,
+                         "Call should have been made 'max_retries' + 1 times")
+
+    def test_call_reports_network_error_retries_to_on_retry(self):
+        """
+        Test that network error retries are recorded without a status code.
+        """
+        on_retry = mock.Mock(name='on-retry')
+        self.req_ctx.on_retry = on_retry
+        error = ConnectionError()
+        self.session.request.side_effect = [error, mock.MagicMock(name='response')]
+        base.call("GET", self.url, self.req_ctx, max_retries=1)
+        attempt = on_retry.call_args[0][0]
+        self.assertEqual((1, None, error), (attempt.attempt, attempt.status_code, attempt.error))
+
+    def test_call_makes_request_with_context_timeout_for_endpoint(self):
+        """
+        Test that the timeout the context configures for the endpoint is passed to the
+        session request when the call doesn't specify one.
+        """
+        self.req_ctx.get_timeout.return_value = (3.05, 27)
+        base.call("GET", self.url, self.req_ctx)
+        self.req_ctx.get_timeout.assert_called_once_with("GET", self.url)
+        self.assertEqual((3.05, 27), self.session.request.call_args[1]['timeout'])
+
+    def test_call_timeout_overrides_context_timeout(self):
+        """
+        Test that a timeout passed to the call takes precedence over the context timeout.
+        """
+        self.req_ctx.get_timeout.return_value = (3.05, 27)
+        base.call("GET", self.url, self.req_ctx, timeout=60)
+        self.assertEqual(60, self.session.request.call_args[1]['timeout'])
+
+    def test_call_serves_repeated_get_from_context_cache(self):
+        """
+        Test that a cacheable GET is only sent once when a cache is set on the context.
+        """
+        self.session.request.return_value.status_code = 200
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.get_cache_ttl.return_value = 60
+        first = base.call("GET", self.url, self.req_ctx, params={'include[]': ['term']})
+        second = base.call("GET", self.url, self.req_ctx, params={'include[]': ['term']})
+        self.assertEqual(1, self.session.request.call_count, "The second call should be served from the cache")
+        self.assertIs(first, second)
+
+    def test_call_does_not_cache_get_without_ttl(self):
+        """
+        Test that a GET is not cached when no ttl is configured for its endpoint.
+        """
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.get_cache_ttl.return_value = 0
+        base.call("GET", self.url, self.req_ctx)
+        base.call("GET", self.url, self.req_ctx)
+        self.assertEqual(2, self.session.request.call_count)
+
+    def test_call_invalidates_cache_after_successful_update(self):
+        """
+        Test that a successful PUT to a resource invalidates its cached GET response.
+        """
+        self.session.request.return_value.status_code = 200
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.get_cache_ttl.return_value = 60
+        base.call("GET", self.url, self.req_ctx)
+        base.call("PUT", self.url, self.req_ctx, data={'course[name]': 'new'})
+        base.call("GET", self.url, self.req_ctx)
+        self.assertEqual(3, self.session.request.call_count, "The GET after the update should be sent again")
+
+    def test_call_does_not_cache_non_2xx_response(self):
+        """
+        Test that a 304 to the caller's own conditional request is not cached and served to later calls.
+        """
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.get_cache_ttl.return_value = 60
+        not_modified = mock.MagicMock(name='not-modified-response', status_code=304, headers={})
+        ok = mock.MagicMock(name='ok-response', status_code=200, headers={})
+        self.session.request.side_effect = [not_modified, ok]
+        self.assertIs(not_modified, base.call("GET", self.url, self.req_ctx, headers={'If-None-Match': '"abc"'}))
+        self.assertEqual(0, len(self.req_ctx.cache))
+        self.assertIs(ok, base.call("GET", self.url, self.req_ctx))
+
+    def test_call_revalidates_expired_entry_and_serves_it_on_not_modified(self):
+        """
+        Test that with cache_revalidate an expired response is revalidated with its ETag and
+        served from the cache when Canvas answers 304 Not Modified.
+        """
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.cache_revalidate = True
+        self.req_ctx.get_cache_ttl.return_value = 0
+        original = mock.MagicMock(name='original-response', status_code=200, headers={'ETag': 'W/"abc"'})
+        not_modified = mock.MagicMock(name='not-modified-response', status_code=304, headers={})
+        self.session.request.side_effect = [original, not_modified]
+        first = base.call("GET", self.url, self.req_ctx, headers={'my': 'header'})
+        second = base.call("GET", self.url, self.req_ctx, headers={'my': 'header'})
+        self.assertIs(original, first)
+        self.assertIs(original, second, "The cached response should be served on a 304")
+        self.assertEqual({'my': 'header', 'If-None-Match': 'W/"abc"'},
+                         self.session.request.call_args[1]['headers'])
+
+    def test_call_replaces_revalidated_entry_when_modified(self):
+        """
+        Test that a revalidated response that has changed replaces the cached one.
+        """
+        self.req_ctx.cache = MemoryCache()
+        self.req_ctx.cache_revalidate = True
+        self.req_ctx.get_cache_ttl.return_value = 0
+        original = mock.MagicMock(name='original-response', status_code=200,
+                                  headers={'Last-Modified': 'Tue, 01 Sep 2026 10:00:00 GMT'})
+        modified = mock.MagicMock(name='modified-response', status_code=200, headers={})
+        self.session.request.side_effect = [original, modified]
+        base.call("GET", self.url, self.req_ctx)
+        self.assertIs(modified, base.call("GET", self.url, self.req_ctx))
+        self.assertEqual({'If-Modified-Since': 'Tue, 01 Sep 2026 10:00:00 GMT'},
+                         self.session.request.call_args[1]['headers'])
+
+    def test_call_coalesces_identical_concurrent_gets(self):
+        """
+        Test that identical GETs in flight at the same time share one request when the
+        context coalesces requests.
+        """
+        self.req_ctx.single_flight = SingleFlight()
+        release = threading.Event()
+
+        def request(*args, **kwargs):
+            release.wait(5)
+            return mock.MagicMock(name='response')
+
+        self.session.request.side_effect = request
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(base.call("GET", self.url, self.req_ctx)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 5
+        while self.req_ctx.single_flight.coalesced < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(1, self.session.request.call_count)
+        self.assertEqual(3, len(responses))
+        self.assertEqual(1, len(set(map(id, responses))), "Every caller should receive the shared response")
+
+    def test_call_requests_page_size_chosen_by_context_for_list_requests(self):
+        """
+        Test that a list request without a per_page is sent with the page size the context chooses,
+        and that the context learns from the response.
+        """
+        self.req_ctx.get_per_page.return_value = 100
+        response = base.call("GET", self.url, self.req_ctx, params={'include': 'email', 'per_page': None})
+        self.assertEqual({'include': 'email', 'per_page': 100}, self.session.request.call_args[1]['params'])
+        self.req_ctx.update_per_page.assert_called_once_with(self.url, response)
+
+    def test_call_keeps_per_page_chosen_by_caller(self):
+        """
+        Test that a per_page passed by the caller is sent unchanged and nothing is learned from it.
+        """
+        self.req_ctx.get_per_page.return_value = 100
+        base.call("GET", self.url, self.req_ctx, params={'per_page': 5})
+        self.assertEqual({'per_page': 5}, self.session.request.call_args[1]['params'])
+        self.assertFalse(self.req_ctx.update_per_page.called)
+
+    def test_call_decodes_error_json_with_context_decoder(self):
+        """
+        Test that the json of an error response is decoded by the context's json_decoder.
+        """
+        self.req_ctx.json_decoder = mock.Mock(name='json-decoder', return_value={'errors': 'not found'})
+        self.session.request.return_value.content = b'{"errors": "not found"}'
+        canvas_error = self.make_retry_call_with_error_code(404)
+        self.req_ctx.json_decoder.assert_called_once_with(b'{"errors": "not found"}')
+        self.assertEqual({'errors': 'not found'}, canvas_error.error_json)
@@ -0,0 +1,215 @@
+import itertools
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+from unittest.mock import patch
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from canvas_sdk.client.cache import CacheEntry, MemoryCache, SQLiteCache, build_cache_key, is_affected_path
+
+
+class TestCache(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.url = 'https://canvas.example.edu/api/v1/courses/1'
+
+    def build_entry(self, path='/api/v1/courses/1', ttl=60):
+        return CacheEntry(mock.Mock(name='response'), time.time() + ttl, path)
+
+    def test_build_cache_key_ignores_param_order(self):
+        """
+        Test that the same params in a different order produce the same key
+        """
+        self.assertEqual(build_cache_key(self.url, {'a': 1, 'include[]': ['x', 'y']}),
+                         build_cache_key(self.url, [('include[]', 'x'), ('a', 1), ('include[]', 'y')]))
+
+    def test_build_cache_key_ignores_none_params(self):
+        """
+        Test that params with a value of None, which are not sent, don't change the key
+        """
+        self.assertEqual(build_cache_key(self.url), build_cache_key(self.url, {'include': None}))
+
+    def test_build_cache_key_differs_by_masquerading_user_and_token(self):
+        """
+        Test that requests made as another user or with another token get different keys
+        """
+        key = build_cache_key(self.url, auth_token='token')
+        self.assertNotEqual(key, build_cache_key(self.url, {'as_user_id': 5}, auth_token='token'))
+        self.assertNotEqual(key, build_cache_key(self.url, auth_token='other-token'))
+        self.assertNotIn('token', key, "The token itself should not be part of the key")
+
+    def test_is_affected_path(self):
+        """
+        Test that a change affects the resource, resources nested under it and its collection
+        """
+        changed = '/api/v1/courses/1'
+        self.assertTrue(is_affected_path('/api/v1/courses/1', changed))
+        self.assertTrue(is_affected_path('/api/v1/courses/1/users', changed))
+        self.assertTrue(is_affected_path('/api/v1/courses', changed))
+        self.assertFalse(is_affected_path('/api/v1/courses/10', changed))
+        self.assertFalse(is_affected_path('/api/v1/accounts/1', changed))
+
+    def test_get_returns_fresh_entry_and_counts_hits(self):
+        """
+        Test that a stored entry is returned until it expires
+        """
+        cache = MemoryCache()
+        entry = self.build_entry()
+        cache.set('key', entry)
+        self.assertIs(entry, cache.get('key'))
+        self.assertEqual(None, cache.get('other-key'))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_get_drops_expired_entry(self):
+        """
+        Test that an expired entry is not returned and is removed
+        """
+        cache = MemoryCache()
+        cache.set('key', self.build_entry(ttl=-1))
+        self.assertEqual(None, cache.get('key'))
+        self.assertEqual(0, len(cache))
+
+    def test_set_evicts_least_recently_used_entry(self):
+        """
+        Test that the least recently used entry is evicted once maxsize is exceeded
+        """
+        cache = MemoryCache(maxsize=2)
+        cache.set('a', self.build_entry())
+        cache.set('b', self.build_entry())
+        cache.get('a')
+        cache.set('c', self.build_entry())
+        self.assertEqual(None, cache.get('b'), "b was least recently used and should have been evicted")
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_invalidate_removes_affected_entries(self):
+        """
+        Test that invalidating a url removes the entries it may have made stale
+        """
+        cache = MemoryCache()
+        cache.set('course', self.build_entry('/api/v1/courses/1'))
+        cache.set('users', self.build_entry('/api/v1/courses/1/users'))
+        cache.set('other', self.build_entry('/api/v1/courses/2'))
+        cache.invalidate(self.url)
+        self.assertEqual(None, cache.get('course'))
+        self.assertEqual(None, cache.get('users'))
+        self.assertIsNotNone(cache.get('other'))
+
+    @patch('canvas_sdk.client.cache.os.getpid')
+    def test_lock_is_recreated_after_fork(self, mock_getpid):
+        """
+        Test that a child forked while another thread held the lock does not deadlock on it
+        """
+        mock_getpid.return_value = 100
+        cache = MemoryCache()
+        cache.set('key', self.build_entry())
+        cache._lock.acquire()
+        mock_getpid.return_value = 101
+        self.assertIsNotNone(cache.get('key'))
+
+    def test_get_allow_stale_returns_expired_entry_with_validators(self):
+        """
+        Test that an expired entry with an ETag is kept and returned for revalidation
+        """
+        cache = MemoryCache()
+        entry = CacheEntry(mock.Mock(name='response'), time.time() - 1, '/api/v1/courses/1', etag='"abc"')
+        cache.set('key', entry)
+        self.assertIs(entry, cache.get('key', allow_stale=True))
+        self.assertEqual({'If-None-Match': '"abc"'}, entry.conditional_headers)
+        self.assertEqual(None, cache.get('key'), "Without allow_stale the expired entry should not be returned")
+
+    def test_get_allow_stale_drops_expired_entry_without_validators(self):
+        """
+        Test that an expired entry that cannot be revalidated is dropped even with allow_stale
+        """
+        cache = MemoryCache()
+        cache.set('key', self.build_entry(ttl=-1))
+        self.assertEqual(None, cache.get('key', allow_stale=True))
+        self.assertEqual(0, len(cache))
+
+
+class TestSQLiteCache(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'cache.sqlite')
+        self.cache = SQLiteCache(self.filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build_entry(self, path='/api/v1/courses/1', ttl=60, content=b'{"id": 1}', **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = 'https://canvas.example.edu' + path
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json', 'Link': '<next>; rel="next"'})
+        response._content = content
+        return CacheEntry(response, time.time() + ttl, path, **kwargs)
+
+    def test_get_returns_stored_response(self):
+        """
+        Test that the status, headers and body of a stored response are returned
+        """
+        self.cache.set('key', self.build_entry())
+        response = self.cache.get('key').response
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'id': 1}, response.json())
+        self.assertEqual('<next>; rel="next"', response.headers['link'], "Headers should stay case insensitive")
+        self.assertEqual(None, self.cache.get('other-key'))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_entries_are_shared_between_instances(self):
+        """
+        Test that another instance opening the same file, e.g. in another process, sees stored responses
+        """
+        self.cache.set('key', self.build_entry())
+        other = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(b'{"id": 1}', other.get('key').response.content)
+        other.invalidate('/api/v1/courses/1')
+        self.assertEqual(None, self.cache.get('key'))
+
+    def test_get_drops_expired_entry(self):
+        """
+        Test that an expired entry is removed unless it can be revalidated
+        """
+        self.cache.set('key', self.build_entry(ttl=-1))
+        self.cache.set('etag', self.build_entry(ttl=-1, etag='"abc"'))
+        self.assertEqual(None, self.cache.get('key', allow_stale=True))
+        self.assertEqual('"abc"', self.cache.get('etag', allow_stale=True).etag)
+        self.assertEqual(1, len(self.cache))
+
+    def test_set_evicts_least_recently_used_entry(self):
+        """
+        Test that the least recently used entry is evicted once maxsize is exceeded
+        """
+        cache = SQLiteCache(self.filename, maxsize=2)
+        with patch('canvas_sdk.client.cache.time.time', side_effect=itertools.count(time.time())):
+            cache.set('a', self.build_entry())
+            cache.set('b', self.build_entry())
+            cache.get('a')
+            cache.set('c', self.build_entry())
+        self.assertEqual(None, cache.get('b'), "b was least recently used and should have been evicted")
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_invalidate_removes_affected_entries(self):
+        """
+        Test that invalidating a url removes the entries it may have made stale
+        """
+        self.cache.set('course', self.build_entry('/api/v1/courses/1'))
+        self.cache.set('users', self.build_entry('/api/v1/courses/1/users'))
+        self.cache.set('courses', self.build_entry('/api/v1/courses'))
+        self.cache.set('other', self.build_entry('/api/v1/courses/10'))
+        self.cache.invalidate('https://canvas.example.edu/api/v1/courses/1')
+        self.assertEqual(1, len(self.cache))
+        self.assertIsNotNone(self.cache.get('other'))
@@ -0,0 +1,107 @@
+import asyncio
+import pickle
+import threading
+import unittest
+
+from canvas_sdk.client.coalesce import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    longMessage = True
+
+    def run_concurrently(self, single_flight, function, callers=5):
+        """
+        Call single_flight.do from several threads while function blocks, returning each caller's outcome
+        """
+        outcomes = [None] * callers
+        started = threading.Barrier(callers)
+
+        def caller(index):
+            started.wait()
+            try:
+                outcomes[index] = single_flight.do('key', function)
+            except Exception as error:
+                outcomes[index] = error
+
+        threads = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return outcomes
+
+    def test_do_shares_result_of_call_in_progress(self):
+        """
+        Test that concurrent callers for the same key share a single call
+        """
+        single_flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def function():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        outcomes = self.run_concurrently(single_flight, function)
+        self.assertEqual(['result'] * 5, outcomes)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, single_flight.coalesced)
+
+    def test_do_raises_error_for_every_caller(self):
+        """
+        Test that callers waiting on a call that fails have its exception raised
+        """
+        single_flight = SingleFlight()
+        error = ValueError('failed')
+        release = threading.Event()
+
+        def function():
+            release.wait(5)
+            raise error
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        self.assertEqual([error] * 3, self.run_concurrently(single_flight, function, callers=3))
+
+    def test_do_calls_again_once_call_has_finished(self):
+        """
+        Test that results are only shared while a call is in progress
+        """
+        single_flight = SingleFlight()
+        self.assertEqual(1, single_flight.do('key', lambda: 1))
+        self.assertEqual(2, single_flight.do('key', lambda: 2))
+        self.assertEqual(0, single_flight.coalesced)
+
+    def test_async_do_shares_task_in_progress(self):
+        """
+        Test that concurrent coroutines for the same key share a single call
+        """
+        single_flight = SingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        async def main():
+            return await asyncio.gather(*[single_flight.async_do('key', function) for _ in range(5)])
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(['result'] * 5, loop.run_until_complete(main()))
+        finally:
+            loop.close()
+        self.assertEqual(1, len(calls))
+        self.assertEqual({}, single_flight._tasks)
+
+    def test_pickle_drops_calls_in_progress(self):
+        """
+        Test that an unpickled instance starts without calls in progress
+        """
+        single_flight = SingleFlight()
+        single_flight._flights['key'] = object()
+        self.assertEqual({}, pickle.loads(pickle.dumps(single_flight))._flights)
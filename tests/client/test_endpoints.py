@@ -0,0 +1,55 @@
+import unittest
+
+from canvas_sdk.client.endpoints import EndpointMap, endpoint_template
+
+
+class TestEndpointMap(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.base_api_url = 'https://canvas.example.edu/api'
+
+    def test_match_placeholders_match_single_path_segment(self):
+        """
+        Test that a template placeholder matches one path segment and nothing more
+        """
+        endpoints = EndpointMap(self.base_api_url, {'/v1/courses/{id}': 'course'})
+        self.assertEqual('course', endpoints.match('GET', self.base_api_url + '/v1/courses/sis_course_id:abc'))
+        self.assertEqual('course', endpoints.match('GET', self.base_api_url + '/v1/courses/1/'))
+        self.assertEqual(None, endpoints.match('GET', self.base_api_url + '/v1/courses/1/users'))
+
+    def test_match_ignores_query_string(self):
+        """
+        Test that query parameters don't prevent a match
+        """
+        endpoints = EndpointMap(self.base_api_url, {'/v1/accounts/{account_id}/roles': 'roles'})
+        self.assertEqual('roles', endpoints.match(
+            'GET', self.base_api_url + '/v1/accounts/1/roles?page=2&per_page=100'))
+
+    def test_match_prefers_method_qualified_templates(self):
+        """
+        Test that templates with an http method win over unqualified ones, and only match that method
+        """
+        endpoints = EndpointMap(self.base_api_url, {
+            '/v1/accounts/{account_id}/reports/{report}': 'any',
+            'post /v1/accounts/{account_id}/reports/{report}': 'post',
+        })
+        url = self.base_api_url + '/v1/accounts/1/reports/grade_export_csv'
+        self.assertEqual('post', endpoints.match('POST', url))
+        self.assertEqual('any', endpoints.match('GET', url))
+
+    def test_match_returns_default_when_nothing_matches(self):
+        """
+        Test that the default is returned for unknown endpoints and for an empty map
+        """
+        self.assertEqual('default', EndpointMap(self.base_api_url).match('GET', self.base_api_url, 'default'))
+        endpoints = EndpointMap(self.base_api_url, {'/v1/courses/{id}': 'course'})
+        self.assertEqual('default', endpoints.match('GET', self.base_api_url + '/v1/users/1', 'default'))
+
+    def test_endpoint_template_replaces_object_ids(self):
+        """
+        Test that numeric, SIS and 'self' ids are replaced while endpoint names are kept
+        """
+        self.assertEqual('/api/v1/courses/{id}/users', endpoint_template('/api/v1/courses/1234/users'))
+        self.assertEqual('/api/v1/courses/{id}/users', endpoint_template('/api/v1/courses/sis_course_id%3AA1/users'))
+        self.assertEqual('/api/v1/users/{id}/page_views', endpoint_template('/api/v1/users/self/page_views'))
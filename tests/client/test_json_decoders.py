@@ -0,0 +1,44 @@
+import json
+import unittest
+
+from unittest import mock
+
+from canvas_sdk.client import json_decoders
+from canvas_sdk.client.json_decoders import decode_json, fast_json_decoder
+
+
+class TestJsonDecoders(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.req_ctx = mock.MagicMock(name='request-context', json_decoder=None)
+        self.response = mock.MagicMock(name='response', content=b'[{"id": 1, "name": "Zo\\u00eb"}]')
+
+    def test_decode_json_uses_response_json_without_decoder(self):
+        """
+        Test that bodies are decoded by response.json() when the context has no json_decoder
+        """
+        self.assertIs(self.response.json.return_value, decode_json(self.req_ctx, self.response))
+
+    def test_decode_json_passes_body_to_context_decoder(self):
+        """
+        Test that the raw body is passed to the context's json_decoder
+        """
+        self.req_ctx.json_decoder = json.loads
+        self.assertEqual([{'id': 1, 'name': 'Zoë'}], decode_json(self.req_ctx, self.response))
+        self.assertFalse(self.response.json.called)
+
+    def test_fast_json_decoder_decodes_bytes_and_rejects_invalid_json(self):
+        """
+        Test that the fast decoder (orjson when installed) decodes bytes and raises a ValueError for invalid json
+        """
+        self.assertEqual([{'id': 1, 'name': 'Zoë'}], fast_json_decoder(self.response.content))
+        with self.assertRaises(ValueError):
+            fast_json_decoder(b'<html>Not Found</html>')
+
+    def test_fast_json_decoder_is_orjson_when_installed(self):
+        """
+        Test that orjson is preferred over the standard library when it is installed
+        """
+        expected = json.loads if json_decoders.orjson is None else json_decoders.orjson.loads
+        self.assertIs(expected, fast_json_decoder)
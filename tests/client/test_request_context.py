@@ -1,3 +1,5 @@
+import pickle
+import threading
 import unittest
 from unittest import mock
 from unittest.mock import patch
@@ -106,6 +108,21 @@ class TestRequestContext(unittest.TestCase):
         context = RequestContext(self.auth_token, self.base_api_url)
         self.assertEqual(True, context.verify, "verify should default to True on creation")
 
+    def test_initialize_throttle_defaults_to_none(self):
+        """
+        Test that if throttle is not passed in, the instance attribute defaults to None
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        self.assertEqual(None, context.throttle, "throttle should default to None on creation")
+
+    def test_initialize_pool_settings_default_to_requests_defaults(self):
+        """
+        Test that if pool settings are not passed in, they default to the values requests uses
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        self.assertEqual((10, 10, False), (context.pool_connections, context.pool_maxsize, context.pool_block),
+                         "pool settings should default to the requests HTTPAdapter defaults on creation")
+
     def test_initialize_merges_headers(self):
         """
         Test that if headers are passed in, they are merged into the default headers
@@ -233,16 +250,36 @@ class TestRequestContext(unittest.TestCase):
         self.assertEqual(
             'my-cert', result.cert, "Cert attribute on session should be equivalent to attribute passed in to context")
 
-    @patch('canvas_sdk.client.request_context.requests.Session')
-    @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
-    def test_session_creation_sets_timeout_to_instance_value(self, mock_auth, mock_requests_session):
+    def test_get_timeout_returns_instance_timeout(self):
         """
-        Test that Session object is created with context timeout value.
+        Test that get_timeout returns the context timeout when no endpoint override matches (requests.Session has no
+        timeout attribute, so the timeout has to be passed along with each request).
         """
-        context = RequestContext(self.auth_token, self.base_api_url, timeout=60)
-        result = context.session
-        self.assertEqual(
-            60, result.timeout, "Timeout attribute on session should be equivalent to attribute passed in to context")
+        context = RequestContext(self.auth_token, self.base_api_url, timeout=(3.05, 60))
+        self.assertEqual((3.05, 60), context.get_timeout('GET', self.base_api_url + '/v1/courses/1'),
+                         "Timeout should be the timeout passed in to context")
+
+    def test_get_timeout_converts_list_to_tuple(self):
+        """
+        Test that a (connect, read) timeout given as a list is returned as a tuple, which is what requests expects
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, timeout=[3.05, 60])
+        self.assertEqual((3.05, 60), context.get_timeout('GET', self.base_api_url + '/v1/courses/1'))
+
+    def test_get_timeout_returns_endpoint_override(self):
+        """
+        Test that get_timeout returns the timeout configured for a matching endpoint
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, timeout=10, endpoint_timeouts={
+            'POST /v1/accounts/{account_id}/reports/{report}': (5, 300),
+            '/v1/courses/{course_id}/discussion_topics/{topic_id}/view': (5, 120),
+        })
+        self.assertEqual((5, 300), context.get_timeout(
+            'POST', self.base_api_url + '/v1/accounts/1/reports/provisioning_csv'))
+        self.assertEqual(10, context.get_timeout(
+            'GET', self.base_api_url + '/v1/accounts/1/reports/provisioning_csv'))
+        self.assertEqual((5, 120), context.get_timeout(
+            'GET', self.base_api_url + '/v1/courses/1/discussion_topics/2/view'))
 
     @patch('canvas_sdk.client.request_context.requests.Session')
     @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
@@ -296,6 +333,42 @@ class TestRequestContext(unittest.TestCase):
         self.assertEqual(context_cookies, result.cookies,
                          "Cookies attribute should be set to context value")
 
+    @patch('canvas_sdk.client.request_context.HTTPAdapter')
+    @patch('canvas_sdk.client.request_context.requests.Session')
+    @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
+    def test_session_creation_mounts_adapters_with_pool_settings(self, mock_auth, mock_requests_session,
+                                                                 mock_adapter):
+        """
+        Test that Session object is created with http and https adapters sized by the context pool settings
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, pool_connections=4, pool_maxsize=32,
+                                 pool_block=True)
+        result = context.session
+        mock_adapter.assert_called_with(pool_connections=4, pool_maxsize=32, pool_block=True)
+        result.mount.assert_has_calls([
+            mock.call('https://', mock_adapter.return_value),
+            mock.call('http://', mock_adapter.return_value),
+        ])
+
+    def test_pool_stats_counts_new_and_reused_connections(self):
+        """
+        Test that pool_stats adds up request and connection counts of the session's connection pools
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        pools = {
+            'host-a': mock.Mock(num_requests=10, num_connections=2),
+            'host-b': mock.Mock(num_requests=5, num_connections=1),
+        }
+        context.session = mock.Mock(adapters={'https://': mock.Mock(poolmanager=mock.Mock(pools=pools))})
+        self.assertEqual({'requests': 15, 'new_connections': 3, 'reused_connections': 12}, context.pool_stats())
+
+    def test_pool_stats_without_session(self):
+        """
+        Test that pool_stats reports zeros before any request has been made
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        self.assertEqual({'requests': 0, 'new_connections': 0, 'reused_connections': 0}, context.pool_stats())
+
     def test_session_returns_stored_value_after_initial_creation(self):
         """
         Test that a previously created session is stored/returned when session property is called
@@ -316,3 +389,101 @@ class TestRequestContext(unittest.TestCase):
         context.expire_session()
         self.assertNotEqual(previous_session, context.session,
                             "Prior stored session should have been cleared out after call to expire_session")
+
+    @patch('canvas_sdk.client.request_context.requests.Session')
+    @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
+    def test_shared_session_is_created_once_by_concurrent_threads(self, mock_auth, mock_requests_session):
+        """
+        Test that threads racing to use a new context end up sharing a single session
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        mock_requests_session.side_effect = lambda: mock.MagicMock(name='session')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(context.session)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, mock_requests_session.call_count, "Only one session should have been created")
+        self.assertEqual(1, len(set(map(id, results))), "All threads should share the session")
+
+    @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
+    def test_per_thread_sessions_gives_each_thread_its_own_session(self, mock_auth):
+        """
+        Test that with per_thread_sessions each thread reuses its own session
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, per_thread_sessions=True)
+        main_session = context.session
+        self.assertIs(main_session, context.session, "A thread should reuse its session")
+        other_sessions = []
+        thread = threading.Thread(target=lambda: other_sessions.append(context.session))
+        thread.start()
+        thread.join()
+        self.assertIsNot(main_session, other_sessions[0], "Another thread should get a different session")
+
+    @patch.object(RequestContext, 'auth', new_callable=mock.PropertyMock)
+    def test_expire_session_expires_per_thread_sessions(self, mock_auth):
+        """
+        Test that expire_session makes every thread create a new session
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, per_thread_sessions=True)
+        previous_session = context.session
+        context.expire_session()
+        self.assertIsNot(previous_session, context.session,
+                         "A new session should be created after the sessions were expired")
+
+    def test_pickle_drops_session_and_keeps_configuration(self):
+        """
+        Test that a pickled context keeps its configuration but not its session
+        """
+        self.mock_default_headers.return_value = {}  # A mock can't be pickled
+        context = RequestContext(self.auth_token, self.base_api_url, max_retries=3, timeout=(3.05, 60),
+                                 endpoint_timeouts={'/v1/courses/{id}': 5})
+        context.session = mock.sentinel.session
+        result = pickle.loads(pickle.dumps(context))
+        self.assertEqual((self.auth_token, self.base_api_url, 3), (result.auth_token, result.base_api_url,
+                                                                   result.max_retries))
+        self.assertEqual(5, result.get_timeout('GET', self.base_api_url + '/v1/courses/1'))
+        self.assertEqual(None, result._session, "The session should not be pickled")
+
+    @patch('canvas_sdk.client.request_context.os.getpid')
+    def test_session_is_recreated_after_fork(self, mock_getpid):
+        """
+        Test that a session created in a parent process is not reused by a forked child
+        """
+        mock_getpid.return_value = 100
+        context = RequestContext(self.auth_token, self.base_api_url)
+        context.session = mock.sentinel.parent_session
+        self.assertIs(mock.sentinel.parent_session, context.session, "Same process should reuse its session")
+        mock_getpid.return_value = 101
+        self.assertIsNot(mock.sentinel.parent_session, context.session,
+                         "A child process should create its own session")
+
+    def test_get_cache_ttl_returns_endpoint_ttl_or_default(self):
+        """
+        Test that get_cache_ttl uses the matching cache_ttls entry and falls back to cache_ttl
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, cache_ttl=30,
+                                 cache_ttls={'/v1/accounts/{account_id}/roles': 3600})
+        self.assertEqual(3600, context.get_cache_ttl(self.base_api_url + '/v1/accounts/1/roles'))
+        self.assertEqual(30, context.get_cache_ttl(self.base_api_url + '/v1/accounts/1/terms'))
+
+    def test_get_per_page_returns_none_unless_adaptive(self):
+        """
+        Test that get_per_page leaves the page size to Canvas unless adaptive_per_page is set
+        """
+        context = RequestContext(self.auth_token, self.base_api_url)
+        self.assertEqual(None, context.get_per_page(self.base_api_url + '/v1/courses/1/users'))
+
+    def test_get_per_page_returns_page_size_learned_for_endpoint(self):
+        """
+        Test that get_per_page asks for max_per_page until the page size Canvas honored for the endpoint is known
+        """
+        context = RequestContext(self.auth_token, self.base_api_url, adaptive_per_page=True, max_per_page=100)
+        url = self.base_api_url + '/v1/courses/1/users'
+        self.assertEqual(100, context.get_per_page(url))
+        response = mock.Mock(links={'next': {'url': url + '?page=2&per_page=50', 'rel': 'next'}})
+        context.update_per_page(url, response)
+        self.assertEqual(50, context.get_per_page(self.base_api_url + '/v1/courses/sis_course_id:A1/users'),
+                         "The learned page size should apply to every course")
+        self.assertEqual(100, context.get_per_page(self.base_api_url + '/v1/accounts/1/users'))
@@ -0,0 +1,82 @@
+import datetime
+import email.utils
+import unittest
+
+from unittest import mock
+from unittest.mock import patch
+
+from canvas_sdk.client.retry import (
+    DecorrelatedJitterBackoff, ExponentialBackoff, parse_retry_after)
+
+
+class TestRetry(unittest.TestCase):
+    longMessage = True
+
+    def build_response_mock(self, retry_after=None):
+        headers = {}
+        if retry_after is not None:
+            headers['Retry-After'] = retry_after
+        return mock.Mock(headers=headers)
+
+    def test_parse_retry_after_seconds(self):
+        """
+        Test that a delay-seconds Retry-After value is returned as a float
+        """
+        self.assertEqual(12.0, parse_retry_after(self.build_response_mock('12')))
+
+    def test_parse_retry_after_http_date(self):
+        """
+        Test that an HTTP-date Retry-After value is converted into a number of seconds from now
+        """
+        retry_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+        result = parse_retry_after(self.build_response_mock(email.utils.format_datetime(retry_at, usegmt=True)))
+        self.assertTrue(25 < result <= 30, "Retry-After date should be about 30 seconds away")
+
+    def test_parse_retry_after_missing_or_malformed(self):
+        """
+        Test that None is returned when there is no usable Retry-After header
+        """
+        self.assertEqual(None, parse_retry_after(self.build_response_mock()))
+        self.assertEqual(None, parse_retry_after(self.build_response_mock('soon')))
+
+    def test_exponential_backoff_without_jitter(self):
+        """
+        Test that exponential delays grow by the multiplier and are capped by max_delay
+        """
+        backoff = ExponentialBackoff(base=1, multiplier=2, jitter=False, max_delay=5)
+        self.assertEqual([1, 2, 4, 5], [backoff.get_delay(attempt) for attempt in range(1, 5)])
+
+    @patch('canvas_sdk.client.retry.random.uniform')
+    def test_exponential_backoff_with_jitter(self, mock_uniform):
+        """
+        Test that full jitter draws each delay between zero and the exponential value
+        """
+        mock_uniform.return_value = 1.7
+        backoff = ExponentialBackoff(base=1, multiplier=2)
+        self.assertEqual(1.7, backoff.get_delay(3))
+        mock_uniform.assert_called_once_with(0, 4)
+
+    @patch('canvas_sdk.client.retry.random.uniform')
+    def test_decorrelated_jitter_backoff_draws_from_previous_delay(self, mock_uniform):
+        """
+        Test that decorrelated jitter draws between base and three times the previous delay
+        """
+        mock_uniform.return_value = 4.0
+        backoff = DecorrelatedJitterBackoff(base=0.5, max_delay=10)
+        self.assertEqual(4.0, backoff.get_delay(2, previous_delay=2.0))
+        mock_uniform.assert_called_once_with(0.5, 6.0)
+
+    def test_get_delay_honors_retry_after(self):
+        """
+        Test that a longer Retry-After overrides the computed delay and max_delay
+        """
+        backoff = ExponentialBackoff(base=1, jitter=False, max_delay=5)
+        self.assertEqual(120.0, backoff.get_delay(1, response=self.build_response_mock('120')))
+        self.assertEqual(1, backoff.get_delay(1, response=self.build_response_mock('0')))
+
+    def test_get_delay_ignores_retry_after_when_disabled(self):
+        """
+        Test that Retry-After is ignored when respect_retry_after is False
+        """
+        backoff = ExponentialBackoff(base=1, jitter=False, respect_retry_after=False)
+        self.assertEqual(1, backoff.get_delay(1, response=self.build_response_mock('120')))
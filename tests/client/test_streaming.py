@@ -0,0 +1,86 @@
+import io
+import json
+import unittest
+
+import requests
+
+from canvas_sdk.client.streaming import iter_json_array, iter_response_items
+
+
+class TestStreaming(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.items = [
+            {'id': 1, 'name': 'Zoë [TA], "lead"', 'scores': [1.5, None, True]},
+            12345,
+            'a string with , and ]',
+            [],
+            {},
+        ]
+        self.text = json.dumps(self.items, ensure_ascii=False)
+
+    def test_iter_json_array_parses_elements_split_across_chunks(self):
+        """
+        Test that elements are parsed however the text is split, including numbers split at a chunk boundary
+        """
+        for size in (1, 2, 3, 7, len(self.text)):
+            chunks = [self.text[start:start + size] for start in range(0, len(self.text), size)]
+            self.assertEqual(self.items, list(iter_json_array(chunks)), "chunk size %s" % size)
+
+    def test_iter_json_array_generates_elements_before_array_ends(self):
+        """
+        Test that an element is generated as soon as it is complete
+        """
+        elements = iter_json_array(iter(['[{"id": 1}, ', '{"id"']))
+        self.assertEqual({'id': 1}, next(elements))
+
+    def test_iter_json_array_parses_empty_array(self):
+        """
+        Test that an empty array generates nothing
+        """
+        self.assertEqual([], list(iter_json_array([' [ ', ' ]\n'])))
+
+    def test_iter_json_array_raises_for_non_array(self):
+        """
+        Test that text that is not a json array is rejected
+        """
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"id": 1}']))
+
+    def test_iter_json_array_raises_for_truncated_array(self):
+        """
+        Test that text that ends before the array does is rejected, even after a complete element
+        """
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[{"id": 1}, {"id"']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[1, 2']))
+
+    def test_iter_json_array_waits_for_numbers_split_after_dot_or_exponent(self):
+        """
+        Test that a number split right after its '.', 'e' or 'e-' is parsed whole rather than cut short
+        """
+        self.assertEqual([87.5], list(iter_json_array(['[87.', '5]'])))
+        self.assertEqual([{'score': 1}, 87.5, 2], list(iter_json_array(['[{"score": 1}, 87.', '5, 2]'])))
+        self.assertEqual([1e5, 3], list(iter_json_array(['[1e', '5, 3]'])))
+        self.assertEqual([2.5e-3], list(iter_json_array(['[2.5e-', '3]'])))
+        self.assertEqual([12], list(iter_json_array(['[1', '2', ' ', ']'])))
+
+    def test_iter_json_array_raises_for_malformed_separators(self):
+        """
+        Test that exactly one comma is required between elements, and none before the ']'
+        """
+        for text in ('[1 2]', '[,1]', '[1,,2]', '[1,]', '[,]', '[{"id": 1} {"id": 2}]'):
+            for chunks in ([text], list(text)):
+                with self.assertRaises(ValueError, msg='%r in chunks %r' % (text, chunks)):
+                    list(iter_json_array(chunks))
+
+    def test_iter_response_items_decodes_characters_split_across_chunks(self):
+        """
+        Test that the body of a response is read in chunks, multi-byte characters included, and the response closed
+        """
+        response = requests.Response()
+        response.raw = io.BytesIO(self.text.encode('utf-8'))
+        self.assertEqual(self.items, list(iter_response_items(response, chunk_size=3)))
+        self.assertTrue(response.raw.closed, "The response should be closed once the array has been read")
@@ -0,0 +1,189 @@
+import asyncio
+import pickle
+import threading
+import unittest
+
+from unittest import mock
+from unittest.mock import patch
+
+from canvas_sdk.client.throttle import RateLimitThrottle, is_rate_limit_error
+
+# IsolatedAsyncioTestCase is only available from Python 3.8
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase', unittest.TestCase)
+
+
+class TestThrottle(unittest.TestCase):
+    longMessage = True
+
+    def build_response_mock(self, remaining=None, cost=None, status_code=200, text=''):
+        """
+        Build a mock response carrying the given rate limit headers
+        """
+        headers = {}
+        if remaining is not None:
+            headers['X-Rate-Limit-Remaining'] = str(remaining)
+        if cost is not None:
+            headers['X-Request-Cost'] = str(cost)
+        return mock.Mock(headers=headers, status_code=status_code, text=text)
+
+    def test_is_rate_limit_error_for_rate_limit_forbidden_response(self):
+        """
+        Test that a 403 with a "Rate Limit Exceeded" body is recognized
+        """
+        response = self.build_response_mock(status_code=403, text='403 Forbidden (Rate Limit Exceeded)')
+        self.assertTrue(is_rate_limit_error(response))
+
+    def test_is_rate_limit_error_for_other_responses(self):
+        """
+        Test that other 403s and other statuses mentioning the rate limit are not recognized
+        """
+        self.assertFalse(is_rate_limit_error(self.build_response_mock(status_code=403, text='unauthorized')))
+        self.assertFalse(is_rate_limit_error(self.build_response_mock(status_code=500, text='Rate Limit Exceeded')))
+
+    def test_update_reads_rate_limit_headers(self):
+        """
+        Test that update records the remaining quota and cost of the last request
+        """
+        throttle = RateLimitThrottle()
+        throttle.update(self.build_response_mock(remaining=612.5, cost=1.25))
+        self.assertEqual(612.5, throttle.remaining)
+        self.assertEqual(1.25, throttle.request_cost)
+
+    def test_update_scales_concurrency_with_remaining_quota(self):
+        """
+        Test that concurrency is full above high_water, one at low_water and interpolated in between
+        """
+        throttle = RateLimitThrottle(max_concurrency=11, high_water=300, low_water=100)
+        throttle.update(self.build_response_mock(remaining=500))
+        self.assertEqual(11, throttle.concurrency)
+        throttle.update(self.build_response_mock(remaining=200))
+        self.assertEqual(6, throttle.concurrency)
+        throttle.update(self.build_response_mock(remaining=20))
+        self.assertEqual(1, throttle.concurrency)
+
+    def test_update_ignores_responses_without_rate_limit_headers(self):
+        """
+        Test that a response without headers leaves the throttle untouched
+        """
+        throttle = RateLimitThrottle(max_concurrency=4)
+        throttle.update(self.build_response_mock())
+        self.assertEqual(None, throttle.remaining)
+        self.assertEqual(4, throttle.concurrency)
+
+    def test_update_treats_rate_limit_error_as_empty_bucket(self):
+        """
+        Test that a 403 "Rate Limit Exceeded" response drops concurrency to one
+        """
+        throttle = RateLimitThrottle(max_concurrency=4)
+        throttle.update(self.build_response_mock(status_code=403, text='Rate Limit Exceeded'))
+        self.assertEqual(0, throttle.remaining)
+        self.assertEqual(1, throttle.concurrency)
+
+    @patch('canvas_sdk.client.throttle.time.sleep')
+    def test_acquire_waits_for_cooldown_below_low_water(self, mock_sleep):
+        """
+        Test that acquire sleeps for the cooldown once the remaining quota is low
+        """
+        throttle = RateLimitThrottle(low_water=50, cooldown=2.5)
+        throttle.acquire()
+        throttle.release()
+        self.assertFalse(mock_sleep.called)
+        throttle.update(self.build_response_mock(remaining=10))
+        throttle.acquire()
+        mock_sleep.assert_called_once_with(2.5)
+
+    def test_acquire_blocks_while_concurrency_is_exhausted(self):
+        """
+        Test that acquire blocks until a slot is released
+        """
+        throttle = RateLimitThrottle(max_concurrency=1)
+        throttle.acquire()
+        acquired = threading.Event()
+
+        def worker():
+            throttle.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1), "Second acquire should block while the slot is taken")
+        throttle.release()
+        self.assertTrue(acquired.wait(1), "Second acquire should proceed once the slot is released")
+        thread.join()
+
+    def test_pickle_keeps_settings_and_resets_in_flight_count(self):
+        """
+        Test that a throttle can be pickled into a worker process, where nothing is in flight yet
+        """
+        throttle = RateLimitThrottle(max_concurrency=3)
+        throttle.update(self.build_response_mock(remaining=200))
+        throttle.acquire()
+        result = pickle.loads(pickle.dumps(throttle))
+        self.assertEqual((3, 200, 0), (result.max_concurrency, result.remaining, result.in_flight))
+
+
+@unittest.skipIf(AsyncTestCase is unittest.TestCase, "async tests require Python 3.8 or later")
+class TestThrottleAsync(AsyncTestCase):
+
+    async def start_waiters(self, throttle, count):
+        """
+        Start count tasks that await a slot of throttle, and let them run until they are waiting
+        """
+        tasks = [asyncio.ensure_future(throttle.async_acquire()) for _ in range(count)]
+        await asyncio.sleep(0)
+        return tasks
+
+    async def test_async_acquire_waits_without_polling_until_release(self):
+        """
+        Test that coroutines waiting for a slot stay suspended until a slot is released, one per release
+        """
+        throttle = RateLimitThrottle(max_concurrency=2)
+        tasks = await self.start_waiters(throttle, 5)
+        self.assertEqual(2, throttle.in_flight)
+        self.assertEqual(3, len(throttle._async_waiters))
+        with patch('canvas_sdk.client.throttle.asyncio.sleep') as mock_sleep:
+            throttle.release()
+            await asyncio.wait(tasks, timeout=0.1)
+        self.assertFalse(mock_sleep.called, "Waiting coroutines should not poll")
+        self.assertEqual(3, sum(task.done() for task in tasks))
+        self.assertEqual(2, len(throttle._async_waiters))
+        for task in tasks:
+            task.cancel()
+
+    async def test_async_acquire_wakes_waiters_when_concurrency_grows(self):
+        """
+        Test that raising the allowed concurrency lets as many waiting coroutines proceed
+        """
+        throttle = RateLimitThrottle(max_concurrency=4, high_water=300, low_water=50, cooldown=0)
+        throttle.update(mock.Mock(headers={'X-Rate-Limit-Remaining': '10'}, status_code=200, text=''))
+        tasks = await self.start_waiters(throttle, 4)
+        self.assertEqual(1, throttle.in_flight)
+        throttle.update(mock.Mock(headers={'X-Rate-Limit-Remaining': '500'}, status_code=200, text=''))
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        self.assertEqual(4, throttle.in_flight)
+
+    async def test_async_acquire_wakes_waiter_released_from_other_thread(self):
+        """
+        Test that a slot released by a thread wakes a coroutine waiting on the event loop
+        """
+        throttle = RateLimitThrottle(max_concurrency=1)
+        throttle.acquire()
+        task = asyncio.ensure_future(throttle.async_acquire())
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=throttle.release)
+        thread.start()
+        await asyncio.wait_for(task, timeout=1)
+        thread.join()
+        self.assertEqual(1, throttle.in_flight)
+
+    async def test_cancelled_waiter_passes_on_its_slot(self):
+        """
+        Test that a coroutine cancelled after being woken for a slot leaves it to the next waiter
+        """
+        throttle = RateLimitThrottle(max_concurrency=1)
+        first, second, third = await self.start_waiters(throttle, 3)
+        throttle.release()
+        second.cancel()
+        await asyncio.wait_for(third, timeout=1)
+        self.assertTrue(second.cancelled())
+        self.assertEqual(1, throttle.in_flight)
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from canvas_sdk.checkpoints import FileCheckpointStore, SQLiteCheckpointStore
+
+
+class CheckpointStoreTests(object):
+
+    """
+    Tests shared by every checkpoint store; subclasses implement build_store
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = self.build_store()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_returns_none_without_checkpoint(self):
+        """
+        Test that there is nothing to resume from before a page has been appended
+        """
+        self.assertEqual(None, self.store.load('export'))
+
+    def test_load_returns_items_of_every_page_and_last_next_url(self):
+        """
+        Test that a checkpoint resumes from the next url of the last page appended, with every item so far
+        """
+        self.store.append('export', 'https://canvas/api/v1/users?page=2', [{'id': 1}, {'id': 2}])
+        self.store.append('export', 'https://canvas/api/v1/users?page=3', [{'id': 3}])
+        self.store.append('other-export', 'https://canvas/api/v1/courses?page=2', [{'id': 4}])
+        self.assertEqual(('https://canvas/api/v1/users?page=3', [{'id': 1}, {'id': 2}, {'id': 3}]),
+                         self.store.load('export'))
+
+    def test_delete_removes_checkpoint(self):
+        """
+        Test that a deleted checkpoint is no longer loaded
+        """
+        self.store.append('export', 'https://canvas/api/v1/users?page=2', [{'id': 1}])
+        self.store.delete('export')
+        self.store.delete('never-saved')
+        self.assertEqual(None, self.store.load('export'))
+
+
+class TestFileCheckpointStore(CheckpointStoreTests, unittest.TestCase):
+
+    def build_store(self):
+        return FileCheckpointStore(os.path.join(self.directory.name, 'checkpoints'))
+
+    def test_load_ignores_partially_written_page(self):
+        """
+        Test that a page left half written by a process that died is ignored
+        """
+        self.store.append('export/users', 'https://canvas/api/v1/users?page=2', [{'id': 1}])
+        with open(self.store._path('export/users'), 'a') as checkpoint:
+            checkpoint.write('{"next_url": "https://canvas/api/v1/users?pa')
+        self.assertEqual(('https://canvas/api/v1/users?page=2', [{'id': 1}]), self.store.load('export/users'))
+
+    def test_append_after_partially_written_page(self):
+        """
+        Test that pages appended when resuming after a half written page are read back
+        """
+        self.store.append('export/users', 'https://canvas/api/v1/users?page=2', [{'id': 1}])
+        with open(self.store._path('export/users'), 'a') as checkpoint:
+            checkpoint.write('{"next_url": "https://canvas/api/v1/users?pa')
+        self.assertEqual(('https://canvas/api/v1/users?page=2', [{'id': 1}]), self.store.load('export/users'))
+        self.store.append('export/users', 'https://canvas/api/v1/users?page=3', [{'id': 2}])
+        self.store.append('export/users', 'https://canvas/api/v1/users?page=4', [{'id': 3}])
+        self.assertEqual(('https://canvas/api/v1/users?page=4', [{'id': 1}, {'id': 2}, {'id': 3}]),
+                         self.store.load('export/users'))
+
+
+class TestSQLiteCheckpointStore(CheckpointStoreTests, unittest.TestCase):
+
+    def build_store(self):
+        return SQLiteCheckpointStore(os.path.join(self.directory.name, 'checkpoints.sqlite'))
@@ -0,0 +1,102 @@
+import array
+import math
+import sys
+import unittest
+from unittest import mock
+from unittest.mock import patch
+
+import requests
+
+from canvas_sdk import columnar
+from canvas_sdk.client import RequestContext
+from canvas_sdk.columnar import Column, ColumnarCollector
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.req_ctx = mock.MagicMock(name='request-context', spec=RequestContext)
+        self.req_ctx.json_decoder = None
+
+    def build_response_mock(self, links=None, json_data=None):
+        """
+        Build a MagicMock to imitate a requests.Response whose json call returns json_data
+        """
+        response = mock.MagicMock(spec=requests.Response)
+        response.links = links or {}
+        response.json.return_value = json_data
+        return response
+
+    def test_column_with_typecode_stores_values_in_array(self):
+        """
+        Test that a column with a typecode keeps its values in an array, with missing values stored as missing
+        """
+        scores = Column('score', 'd')
+        ids = Column('grader_id', 'q', missing=-1)
+        items = [{'score': 9.5, 'grader_id': 4}, {'score': None}, {}]
+        scores.extend(items)
+        ids.extend(items)
+        self.assertIsInstance(scores.values, array.array)
+        self.assertEqual(9.5, scores.values[0])
+        self.assertTrue(math.isnan(scores.values[1]) and math.isnan(scores.values[2]))
+        self.assertEqual(array.array('q', [4, -1, -1]), ids.values)
+
+    def test_column_reads_nested_path_and_interns_strings(self):
+        """
+        Test that a column reads its field from nested objects, and interns string values when asked
+        """
+        current_score = Column('current_score', 'd', path=('grades', 'current_score'))
+        current_score.extend([{'grades': {'current_score': 91.0}}])
+        self.assertEqual(array.array('d', [91.0]), current_score.values)
+
+        states = Column('workflow_state', intern=True)
+        states.extend([{'workflow_state': ''.join(['gra', 'ded'])}, {}])
+        self.assertIs(sys.intern('graded'), states.values[0])
+        self.assertEqual(None, states.values[1])
+
+    def test_column_rejects_options_that_do_not_apply(self):
+        """
+        Test that missing requires a typecode and intern requires no typecode
+        """
+        self.assertRaises(AttributeError, Column, 'name', missing='')
+        self.assertRaises(AttributeError, Column, 'id', 'q', intern=True)
+
+    def test_collector_rejects_duplicate_column_names(self):
+        """
+        Test that two columns of a collector cannot share a name
+        """
+        self.assertRaises(AttributeError, ColumnarCollector, [Column('id', 'q'), Column('id')])
+
+    def test_append_page_adds_nothing_when_a_value_does_not_fit(self):
+        """
+        Test that a page with a value that does not fit its column leaves every column as it was
+        """
+        collector = ColumnarCollector([Column('id', 'q'), Column('score', 'q')])
+        collector.append_page([{'id': 1, 'score': 2}])
+        with self.assertRaises(TypeError):
+            collector.append_page([{'id': 2, 'score': 3}, {'id': 3, 'score': 4.5}])
+        self.assertEqual(1, len(collector))
+        self.assertEqual(array.array('q', [1]), collector['id'])
+        self.assertEqual(array.array('q', [2]), collector['score'])
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_collect_columns_appends_every_page(self, mock_client_get):
+        """
+        Test that collect_columns appends the items of the first and every next page to the columns
+        """
+        first_response = self.build_response_mock(
+            links={'next': {'url': 'next-url'}},
+            json_data=[{'id': 1, 'score': 8.0, 'workflow_state': 'graded'}, {'id': 2, 'workflow_state': 'submitted'}])
+        mock_client_get.return_value = self.build_response_mock(json_data=[{'id': 3, 'score': 10.0}])
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+
+        collector = columnar.collect_columns(
+            self.req_ctx, mock_function, 'course-id', columns=[
+                Column('id', 'q'), Column('score', 'd'), Column('workflow_state', intern=True)], per_page=50)
+
+        mock_function.assert_called_once_with(self.req_ctx, 'course-id', per_page=50)
+        mock_client_get.assert_called_once_with(self.req_ctx, 'next-url')
+        self.assertEqual(3, len(collector))
+        self.assertEqual(array.array('q', [1, 2, 3]), collector['id'])
+        self.assertEqual([8.0, 10.0], [score for score in collector['score'] if not math.isnan(score)])
+        self.assertEqual(['graded', 'submitted', None], collector['workflow_state'])
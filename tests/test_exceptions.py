@@ -1,6 +1,6 @@
 import unittest
 
-from canvas_sdk.exceptions import CanvasAPIError
+from canvas_sdk.exceptions import CanvasAPIError, PartialResultError
 
 
 
@@ -34,3 +34,9 @@ class TestExceptions(unittest.TestCase):
 
         api_error = CanvasAPIError(status_code=status, msg=error_msg, error_json=error_json)
         self.assertEqual('%d: %s' % (status, error_msg), str(api_error))
+
+    def test_str_for_partial_result_error(self):
+        """ Test string representation of PartialResultError """
+        error = PartialResultError([1, 2], 'https://canvas/api/v1/users?page=3', CanvasAPIError(502, 'Bad Gateway'))
+        self.assertEqual('Paging stopped at https://canvas/api/v1/users?page=3 after 2 items: 502: Bad Gateway',
+                         str(error))
@@ -0,0 +1,63 @@
+import pickle
+import sys
+import unittest
+
+from canvas_sdk.records import Enrollment, GradeChangeEvent, PageView, User
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_from_json_keeps_record_fields_only(self):
+        """
+        Test that a record is built from the fields it declares, with missing fields set to None
+        """
+        user = User.from_json({'id': 1, 'name': 'Jane Doe', 'login_id': 'jdoe', 'avatar_url': 'https://avatar'})
+        self.assertEqual(1, user.id)
+        self.assertEqual('jdoe', user.login_id)
+        self.assertEqual(None, user.email)
+        self.assertFalse(hasattr(user, 'avatar_url'))
+        self.assertFalse(hasattr(user, '__dict__'))
+
+    def test_from_json_reads_nested_fields(self):
+        """
+        Test that fields mapped to nested objects are read from them, and are None when the object is missing
+        """
+        enrollment = Enrollment.from_json({'id': 7, 'grades': {'current_score': 91.5, 'final_score': 88.0}})
+        self.assertEqual(91.5, enrollment.current_score)
+        self.assertEqual(88.0, enrollment.final_score)
+        self.assertEqual(None, Enrollment.from_json({'id': 8}).current_score)
+        self.assertEqual(None, Enrollment.from_json({'id': 9, 'grades': None}).final_score)
+
+        page_view = PageView.from_json({'id': 'abc', 'links': {'user': 1, 'context': 2, 'account': 3}})
+        self.assertEqual((1, 2, None, 3), (page_view.user_id, page_view.context_id, page_view.asset_id,
+                                           page_view.account_id))
+        event = GradeChangeEvent.from_json({'id': 'e1', 'event_type': 'grade_change',
+                                            'links': {'assignment': 4, 'student': 5, 'grader': 6}})
+        self.assertEqual((4, 5, 6), (event.assignment_id, event.student_id, event.grader_id))
+
+    def test_from_json_interns_enum_fields(self):
+        """
+        Test that the values of interned fields are shared between records
+        """
+        state = ''.join(['act', 'ive'])
+        enrollment = Enrollment.from_json({'id': 1, 'enrollment_state': state})
+        self.assertIs(sys.intern('active'), enrollment.enrollment_state)
+
+    def test_records_compare_and_convert_to_dict(self):
+        """
+        Test that records equal to each other have the same fields, and to_dict returns every field
+        """
+        user = User(id=1, name='Jane Doe')
+        self.assertEqual(user, User.from_json({'id': 1, 'name': 'Jane Doe'}))
+        self.assertNotEqual(user, User(id=2, name='Jane Doe'))
+        expected = dict.fromkeys(User.__slots__)
+        expected.update(id=1, name='Jane Doe')
+        self.assertEqual(expected, user.to_dict())
+        self.assertIn("id=1, name='Jane Doe'", repr(user))
+
+    def test_records_can_be_pickled(self):
+        """
+        Test that records survive pickling, e.g. to be sent between processes
+        """
+        enrollment = Enrollment.from_json({'id': 1, 'type': 'StudentEnrollment', 'grades': {'current_score': 90}})
+        self.assertEqual(enrollment, pickle.loads(pickle.dumps(enrollment)))
@@ -1,9 +1,14 @@
+import json
+import threading
+import time
 import unittest
 from unittest import mock
 import requests
 from unittest.mock import patch
 from canvas_sdk import utils
 from canvas_sdk.client import RequestContext
+from canvas_sdk.exceptions import CanvasAPIError, PartialResultError
+from canvas_sdk.records import Submission
 
 
 class TestUtils(unittest.TestCase):
@@ -11,6 +16,7 @@ class TestUtils(unittest.TestCase):
     def setUp(self):
         self.path = '/v1/accounts'
         self.req_ctx = mock.MagicMock(name='request-context', spec=RequestContext)
+        self.req_ctx.json_decoder = None
 
     def build_response_mock(self, links=None, json_data=None):
         """
@@ -304,36 +310,371 @@ class TestUtils(unittest.TestCase):
         mock_function.assert_called_once_with(
             mock.ANY, params={'as_user_id': as_user_id, 'foo': 'bar'})
 
-    @patch('canvas_sdk.utils.get_all_list_data')
-    def test_get_count_calls_get_all_list_data_with_request_context_and_function(self, mock_get_all):
+    def test_masquerade_does_not_modify_params_kwarg(self):
         """
-        Assert that call to get_count makes a call to get_all_list_data with context and function
+        Assert that masquerade leaves the caller's "params" dictionary untouched, so that it can be shared
+        between threads.
         """
-        mock_function = mock.Mock(name='mock-function')
-        utils.get_count(self.req_ctx, mock_function)
-        mock_get_all.assert_called_once_with(self.req_ctx, mock_function)
+        params = {'foo': 'bar'}
+        utils.masquerade(self.req_ctx, mock.Mock(name='mock-function'), "test-user-id", params=params)
+        self.assertEqual({'foo': 'bar'}, params, "The params kwarg passed in should not be modified")
 
-    @patch('canvas_sdk.utils.get_all_list_data')
-    def test_get_count_calls_get_all_list_data_with_args_and_kwargs(self, mock_get_all):
+    def test_get_count_reads_count_from_last_page_of_single_item_pages(self):
         """
-        Assert that call to get_count makes a call to get_all_list_data with args and kwargs
+        Assert that get_count requests one item per page and returns the page number of the "last" link
         """
-        mock_function = mock.Mock(name='mock-function')
-        arg1, arg2 = 'arg1', 'arg2'
-        kwargs = {'kwarg1': 'val1', 'kwarg2': 'val2'}
+        response = self.build_response_mock(links={
+            'next': {'url': 'https://canvas/api/v1/courses/1/users?page=2&per_page=1'},
+            'last': {'url': 'https://canvas/api/v1/courses/1/users?page=347&per_page=1'},
+        }, json_data=[{'id': 1}])
+        calls = []
 
-        utils.get_count(self.req_ctx, mock_function, arg1, arg2, **kwargs)
-        mock_get_all.assert_called_once_with(mock.ANY, mock.ANY, arg1, arg2, **kwargs)
+        def function(request_ctx, course_id, include=None, per_page=None, **request_kwargs):
+            calls.append((request_ctx, course_id, include, per_page))
+            return response
 
-    @patch('canvas_sdk.utils.get_all_list_data')
-    def test_get_count_returns_length_of_get_all_list_data(self, mock_get_all):
+        self.assertEqual(347, utils.get_count(self.req_ctx, function, 1, include='email'))
+        self.assertEqual([(self.req_ctx, 1, 'email', 1)], calls)
+
+    def test_get_count_counts_single_page(self):
         """
-        Assert that call to get_count makes a call to get_all_list_data with args and kwargs
+        Assert that get_count counts the items of the only page when there is no "next" link
         """
-        mock_get_all.return_value = [1, 2, 3, 4, 5]
-        mock_function = mock.Mock(name='mock-function')
+        response = self.build_response_mock(json_data=[{'id': 1}])
+
+        def function(request_ctx, per_page=None, **request_kwargs):
+            return response
+
+        self.assertEqual(1, utils.get_count(self.req_ctx, function))
+
+    @patch('canvas_sdk.utils.get_next')
+    def test_get_count_counts_pages_without_numbered_last_link(self, mock_get_next):
+        """
+        Assert that get_count walks the pages with the caller's args and kwargs, summing the number of items
+        on each, when Canvas doesn't include a numbered "last" link
+        """
+        bookmark_response = self.build_response_mock(links={
+            'next': {'url': 'https://canvas/api/v1/users?page=bookmark:WzJd&per_page=1'},
+        }, json_data=[1])
+        first_response = self.build_response_mock(json_data=[1, 2, 3])
+        mock_get_next.return_value = iter([self.build_response_mock(json_data=[4, 5])])
+        calls = []
+
+        def function(request_ctx, arg1, per_page=None, **request_kwargs):
+            calls.append(per_page)
+            return bookmark_response if per_page == 1 else first_response
+
+        self.assertEqual(5, utils.get_count(self.req_ctx, function, 'arg1', per_page=100))
+        self.assertEqual([1, 100], calls)
+        mock_get_next.assert_called_once_with(self.req_ctx, first_response)
+
+    @patch('canvas_sdk.utils.get_next')
+    def test_get_count_counts_pages_of_function_without_per_page(self, mock_get_next):
+        """
+        Assert that get_count walks the pages of a function that doesn't take a per_page parameter
+        """
+        mock_get_next.return_value = iter([self.build_response_mock(json_data=[4, 5])])
+        mock_function = mock.Mock(name='mock-function', return_value=self.build_response_mock(json_data=[1, 2, 3]))
+        self.assertEqual(5, utils.get_count(self.req_ctx, mock_function, 'arg1', kwarg1='val1'))
+        mock_function.assert_called_once_with(self.req_ctx, 'arg1', kwarg1='val1')
+
+    def test_call_batch_calls_function_for_each_args_tuple(self):
+        """
+        Assert that call_batch calls the function with the context, each args tuple and the shared kwargs,
+        and generates the results in order
+        """
+        self.req_ctx.throttle = None
+        self.req_ctx.pool_maxsize = 4
+        mock_function = mock.Mock(name='mock-function', side_effect=lambda ctx, *args, **kwargs: sum(args))
+        results = list(utils.call_batch(self.req_ctx, mock_function, [(1, 2), (3, 4), 5], include='user'))
+        self.assertEqual([((1, 2), 3, None), ((3, 4), 7, None), ((5,), 5, None)], results)
+        mock_function.assert_any_call(self.req_ctx, 1, 2, include='user')
+        mock_function.assert_any_call(self.req_ctx, 5, include='user')
+
+    def test_call_batch_returns_errors_without_aborting_batch(self):
+        """
+        Assert that an exception raised by one call is returned in its result and the other calls still run
+        """
+        error = ValueError('failed')
+
+        def function(request_context, value):
+            if value == 2:
+                raise error
+            return value
+
+        results = list(utils.call_batch(self.req_ctx, function, range(5), max_workers=2))
+        self.assertEqual([0, 1, None, 3, 4], [result.response for result in results])
+        self.assertIs(error, results[2].error)
+
+    def test_call_batch_unordered_generates_results_as_completed(self):
+        """
+        Assert that with ordered=False a fast call is not held back by a slow one
+        """
+        release = threading.Event()
+
+        def function(request_context, value):
+            if value == 'slow':
+                release.wait(5)
+            return value
+
+        results = utils.call_batch(self.req_ctx, function, ['slow', 'fast'], max_workers=2, ordered=False)
+        first = next(results)
+        release.set()  # The slow call only finishes once the fast one has been generated
+        self.assertEqual(['fast', 'slow'], [first.response, next(results).response])
+
+    def test_call_batch_defaults_max_workers_to_throttle_concurrency(self):
+        """
+        Assert that the batch runs no more calls at once than the context's throttle allows
+        """
+        self.req_ctx.throttle = mock.Mock(max_concurrency=3)
+        with patch('canvas_sdk.utils.ThreadPoolExecutor', wraps=utils.ThreadPoolExecutor) as mock_executor:
+            list(utils.call_batch(self.req_ctx, mock.Mock(name='mock-function'), range(10)))
+        mock_executor.assert_called_once_with(max_workers=3)
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_iter_all_yields_items_of_each_page(self, mock_client_get):
+        """
+        Assert that iter_all yields the items of the first page and of each "next" page
+        """
+        first_response = self.build_response_mock(links={'next': {'url': 'next-url'}}, json_data=[1, 2])
+        mock_client_get.return_value = self.build_response_mock(json_data=[3])
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        items = utils.iter_all(self.req_ctx, mock_function, 'arg1', kwarg1='val1')
+        self.assertEqual([1, 2, 3], list(items))
+        mock_function.assert_called_once_with(self.req_ctx, 'arg1', kwarg1='val1')
+        mock_client_get.assert_called_once_with(self.req_ctx, 'next-url')
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_iter_all_stops_fetching_pages_at_limit(self, mock_client_get):
+        """
+        Assert that iter_all doesn't request the next page once limit items have been yielded
+        """
+        first_response = self.build_response_mock(links={'next': {'url': 'next-url'}}, json_data=[1, 2, 3])
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        self.assertEqual([1, 2], list(utils.iter_all(self.req_ctx, mock_function, limit=2)))
+        self.assertFalse(mock_client_get.called, "The next page should not have been requested")
+
+    def test_iter_all_yields_non_list_data_as_single_item(self):
+        """
+        Assert that a response whose json data is not a list is yielded as one item
+        """
+        response = self.build_response_mock(json_data={'id': 1})
+        mock_function = mock.Mock(name='mock-function', return_value=response)
+        self.assertEqual([{'id': 1}], list(utils.iter_all(self.req_ctx, mock_function)))
+
+    def test_get_remaining_page_urls_builds_numbered_page_urls(self):
+        """
+        Assert that the urls of every page from "next" to "last" are built from the next link
+        """
+        response = self.build_response_mock(links={
+            'next': {'url': 'https://canvas/api/v1/courses/1/users?include%5B%5D=email&page=2&per_page=10'},
+            'last': {'url': 'https://canvas/api/v1/courses/1/users?include%5B%5D=email&page=4&per_page=10'},
+        })
+        self.assertEqual([
+            'https://canvas/api/v1/courses/1/users?include%5B%5D=email&page=2&per_page=10',
+            'https://canvas/api/v1/courses/1/users?include%5B%5D=email&page=3&per_page=10',
+            'https://canvas/api/v1/courses/1/users?include%5B%5D=email&page=4&per_page=10',
+        ], utils.get_remaining_page_urls(response))
+
+    def test_get_remaining_page_urls_returns_none_for_bookmark_links(self):
+        """
+        Assert that no urls are built when the links use bookmarks or have no "last" page
+        """
+        bookmarks = self.build_response_mock(links={
+            'next': {'url': 'https://canvas/api/v1/users?page=bookmark:WzJd'},
+            'last': {'url': 'https://canvas/api/v1/users?page=bookmark:WzEwXQ'},
+        })
+        no_last = self.build_response_mock(links={'next': {'url': 'https://canvas/api/v1/users?page=2'}})
+        self.assertEqual(None, utils.get_remaining_page_urls(bookmarks))
+        self.assertEqual(None, utils.get_remaining_page_urls(no_last))
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_next_parallel_yields_pages_in_order(self, mock_client_get):
+        """
+        Assert that get_next_parallel requests every remaining page and yields them in page order
+        """
+        self.req_ctx.throttle = None
+        self.req_ctx.pool_maxsize = 4
+        response = self.build_response_mock(links={
+            'next': {'url': 'https://canvas/api/v1/users?page=2'},
+            'last': {'url': 'https://canvas/api/v1/users?page=5'},
+        })
+        mock_client_get.side_effect = lambda ctx, url: url
+        pages = list(utils.get_next_parallel(self.req_ctx, response))
+        self.assertEqual(['https://canvas/api/v1/users?page=%d' % page for page in range(2, 6)], pages)
+
+    @patch('canvas_sdk.utils.get_next')
+    def test_get_next_parallel_falls_back_to_get_next(self, mock_get_next):
+        """
+        Assert that pages are walked sequentially by get_next when there is no numbered "last" page
+        """
+        mock_get_next.return_value = iter(['page-2'])
+        response = self.build_response_mock(links={'next': {'url': 'https://canvas/api/v1/users?page=bookmark:x'}})
+        self.assertEqual(['page-2'], list(utils.get_next_parallel(self.req_ctx, response)))
+        mock_get_next.assert_called_once_with(self.req_ctx, response)
+
+    @patch('canvas_sdk.utils.get_next')
+    def test_get_next_prefetch_fetches_ahead_of_caller(self, mock_get_next):
+        """
+        Assert that get_next_prefetch fetches the following page while the caller holds the current one,
+        and yields the pages in order
+        """
+        fetched = []
+
+        def pages(request_context, response):
+            for page in ('page-2', 'page-3', 'page-4'):
+                fetched.append(page)
+                yield page
+
+        mock_get_next.side_effect = pages
+        prefetched = utils.get_next_prefetch(self.req_ctx, mock.sentinel.response)
+        self.assertEqual('page-2', next(prefetched))
+        deadline = time.time() + 5
+        while len(fetched) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(['page-2', 'page-3'], fetched, "Only the next page should have been fetched ahead")
+        self.assertEqual(['page-3', 'page-4'], list(prefetched))
+        mock_get_next.assert_called_once_with(self.req_ctx, mock.sentinel.response)
+
+    @patch('canvas_sdk.utils.get_next')
+    def test_get_next_prefetch_raises_error_after_earlier_pages(self, mock_get_next):
+        """
+        Assert that an exception raised fetching a page is raised in the caller after the pages before it
+        """
+        error = ValueError('failed')
+
+        def pages(request_context, response):
+            yield 'page-2'
+            raise error
+
+        mock_get_next.side_effect = pages
+        prefetched = utils.get_next_prefetch(self.req_ctx, mock.sentinel.response)
+        self.assertEqual('page-2', next(prefetched))
+        with self.assertRaises(ValueError):
+            next(prefetched)
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_all_list_data_resumable_resumes_from_checkpoint(self, mock_client_get):
+        """
+        Assert that a failed export keeps its checkpoint and a rerun resumes from the page that failed
+        """
+        store = mock.Mock(name='checkpoint-store')
+        store.load.return_value = None
+        first_response = self.build_response_mock(links={'next': {'url': 'page-2'}}, json_data=[1, 2])
+        second_response = self.build_response_mock(links={'next': {'url': 'page-3'}}, json_data=[3])
+        mock_client_get.side_effect = [second_response, CanvasAPIError(502)]
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        with self.assertRaises(CanvasAPIError):
+            utils.get_all_list_data_resumable(
+                self.req_ctx, mock_function, 'arg1', checkpoint_store=store, checkpoint_key='export')
+        self.assertEqual([mock.call('export', 'page-2', [1, 2]), mock.call('export', 'page-3', [3])],
+                         store.append.call_args_list)
+        self.assertFalse(store.delete.called, "The checkpoint should be kept after a failure")
+
+        store.load.return_value = ('page-3', [1, 2, 3])
+        mock_client_get.side_effect = [self.build_response_mock(json_data=[4])]
+        data = utils.get_all_list_data_resumable(
+            self.req_ctx, mock_function, 'arg1', checkpoint_store=store, checkpoint_key='export')
+        self.assertEqual([1, 2, 3, 4], data)
+        mock_client_get.assert_called_with(self.req_ctx, 'page-3')
+        mock_function.assert_called_once_with(self.req_ctx, 'arg1')
+        store.delete.assert_called_once_with('export')
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_all_list_data_partial_preserves_data_retrieved_before_error(self, mock_client_get):
+        """
+        Assert that with partial set, an error while paging is raised as a PartialResultError holding
+        the data retrieved so far and the url of the page that failed
+        """
+        first_response = self.build_response_mock(links={'next': {'url': 'page-2'}}, json_data=[1, 2])
+        second_response = self.build_response_mock(links={'next': {'url': 'page-3'}}, json_data=[3])
+        api_error = CanvasAPIError(502)
+        mock_client_get.side_effect = [second_response, api_error]
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        with self.assertRaises(PartialResultError) as partial_error:
+            utils.get_all_list_data(self.req_ctx, mock_function, partial=True)
+        self.assertEqual([1, 2, 3], partial_error.exception.data)
+        self.assertEqual('page-3', partial_error.exception.next_url)
+        self.assertIs(api_error, partial_error.exception.error)
 
-        result = utils.get_count(self.req_ctx, mock_function)
-        self.assertEqual(result, 5, "The result of get_count should match length of result set")
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_all_list_data_raises_paging_error_without_partial(self, mock_client_get):
+        """
+        Assert that without partial, an error while paging is raised unchanged
+        """
+        first_response = self.build_response_mock(links={'next': {'url': 'page-2'}}, json_data=[1, 2])
+        mock_client_get.side_effect = CanvasAPIError(502)
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        with self.assertRaises(CanvasAPIError):
+            utils.get_all_list_data(self.req_ctx, mock_function)
 
+    @patch('canvas_sdk.utils.iter_response_items')
+    @patch('canvas_sdk.utils.client.get')
+    def test_iter_all_stream_parses_items_of_streamed_pages(self, mock_client_get, mock_iter_response_items):
+        """
+        Assert that with stream set, every page is requested with stream=True and its items are parsed
+        incrementally instead of with response.json
+        """
+        first_response = self.build_response_mock(links={'next': {'url': 'next-url'}})
+        second_response = self.build_response_mock()
+        mock_client_get.return_value = second_response
+        mock_iter_response_items.side_effect = lambda response: iter([1, 2] if response is first_response else [3])
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        self.assertEqual([1, 2, 3], list(utils.iter_all(self.req_ctx, mock_function, 'arg1', stream=True)))
+        mock_function.assert_called_once_with(self.req_ctx, 'arg1', stream=True)
+        mock_client_get.assert_called_once_with(self.req_ctx, 'next-url', stream=True)
+        self.assertFalse(first_response.json.called)
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_all_list_data_decodes_pages_with_context_decoder(self, mock_client_get):
+        """
+        Assert that get_all_list_data decodes every page with the context's json_decoder when it has one
+        """
+        self.req_ctx.json_decoder = json.loads
+        first_response = self.build_response_mock(links={'next': {'url': 'next-url'}})
+        first_response.content = b'[1, 2]'
+        mock_client_get.return_value = self.build_response_mock()
+        mock_client_get.return_value.content = b'[3]'
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        self.assertEqual([1, 2, 3], utils.get_all_list_data(self.req_ctx, mock_function))
+        self.assertFalse(first_response.json.called)
 
+    def test_build_projection_keeps_listed_keys(self):
+        """
+        Assert that a list of keys projects each item onto the keys it has
+        """
+        projection = utils.build_projection(['id', 'sis_user_id', 'login_id'])
+        self.assertEqual({'id': 1, 'login_id': 'jdoe'}, projection({'id': 1, 'name': 'Jane Doe', 'login_id': 'jdoe'}))
+        self.assertIs(len, utils.build_projection(len))
+        self.assertEqual(None, utils.build_projection(None))
+
+    @patch('canvas_sdk.utils.client.get')
+    def test_get_all_list_data_applies_projection_to_each_page(self, mock_client_get):
+        """
+        Assert that get_all_list_data keeps only the projected keys of the items of every page
+        """
+        first_response = self.build_response_mock(
+            links={'next': {'url': 'next-url'}}, json_data=[{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}])
+        mock_client_get.return_value = self.build_response_mock(json_data=[{'id': 3, 'name': 'c'}])
+        mock_function = mock.Mock(name='mock-function', return_value=first_response)
+        data = utils.get_all_list_data(self.req_ctx, mock_function, projection=['id'])
+        self.assertEqual([{'id': 1}, {'id': 2}, {'id': 3}], data)
+        mock_function.assert_called_once_with(self.req_ctx)
+
+    def test_iter_all_converts_items_to_record_class_projection(self):
+        """
+        Assert that iter_all generates each item converted to the record class given as its projection
+        """
+        response = self.build_response_mock(json_data=[{'id': 1, 'workflow_state': 'graded', 'body': 'text'}])
+        mock_function = mock.Mock(name='mock-function', return_value=response)
+        items = list(utils.iter_all(self.req_ctx, mock_function, projection=Submission))
+        self.assertEqual([Submission(id=1, workflow_state='graded')], items)
+
+    def test_iter_all_applies_callable_projection(self):
+        """
+        Assert that iter_all generates each item transformed by a callable projection
+        """
+        response = self.build_response_mock(json_data=[{'id': 1}, {'id': 2}])
+        mock_function = mock.Mock(name='mock-function', return_value=response)
+        items = utils.iter_all(self.req_ctx, mock_function, projection=lambda item: item['id'])
+        self.assertEqual([1, 2], list(items))